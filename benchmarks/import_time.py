@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""Measures the time of `import ndms2_client` in fresh interpreters.
+
+    python benchmarks/import_time.py [--repeat 20]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _import_time() -> (int, list):
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ndms2_client'],
+        cwd=_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+    ).stderr.decode('UTF-8')
+
+    total = 0
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = [p.strip() for p in line[len('import time:'):].split('|')]
+        modules.append((name, int(cumulative)))
+        if name == 'ndms2_client':
+            total = int(cumulative)
+
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    totals = []
+    modules = []
+    for _ in range(args.repeat):
+        total, modules = _import_time()
+        totals.append(total)
+
+    totals.sort()
+    print('import ndms2_client: min %d us, median %d us' % (totals[0], totals[len(totals) // 2]))
+    print('telnetlib imported: %s' % any(name == 'telnetlib' for name, _ in modules))
+
+
+if __name__ == '__main__':
+    main()
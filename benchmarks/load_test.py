@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+"""Measures how router CLI latency degrades with concurrent telnet sessions.
+
+    python benchmarks/load_test.py --simulate
+    python benchmarks/load_test.py --host 192.168.1.1 --username admin --password secret
+    python benchmarks/load_test.py --simulate --concurrency 4 --rates 10 20 50 100
+
+Concurrency is ramped up (1, 2, 4, ...), each session running the command repeatedly,
+optionally rate limited. With `--rates` the per session command rate is ramped instead,
+at a fixed concurrency. For each level the latency percentiles, a latency histogram,
+the error rate and the throughput are reported, followed by the highest concurrency or
+rate keeping p95 latency within the allowed degradation from the first level, and
+the requested rate actually sustained.
+
+Do not run this against production routers at busy hours.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ndms2_client import Connection, ConnectionException, TelnetConnection
+
+
+class SimulatedRouter(object):
+    """Router stand-in with a limited number of CLI sessions and workers."""
+
+    def __init__(self, *, max_sessions: int = 8, workers: int = 2, service_time: float = 0.005):
+        self._sessions = 0
+        self._max_sessions = max_sessions
+        self._active = 0
+        self._workers = workers
+        self._service_time = service_time
+        self._lock = threading.Lock()
+
+    def open_session(self):
+        with self._lock:
+            if self._sessions >= self._max_sessions:
+                raise ConnectionException('Too many sessions')
+            self._sessions += 1
+
+    def close_session(self):
+        with self._lock:
+            self._sessions -= 1
+
+    def execute(self, command: str) -> List[str]:
+        with self._lock:
+            self._active += 1
+            load = self._active
+        try:
+            # commands beyond the worker count share the router CPU
+            time.sleep(self._service_time * max(1.0, load / self._workers))
+        finally:
+            with self._lock:
+                self._active -= 1
+        return ['      model: Simulated']
+
+
+class SimulatedConnection(Connection):
+    def __init__(self, router: SimulatedRouter):
+        self._router = router
+        self._connected = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def connect(self, *, timeout: Optional[float] = None):
+        self._router.open_session()
+        self._connected = True
+
+    def disconnect(self):
+        if self._connected:
+            self._router.close_session()
+            self._connected = False
+
+    def run_command(self, command: str, *, timeout: Optional[float] = None) -> List[str]:
+        if not self._connected:
+            self.connect()
+        return self._router.execute(command)
+
+
+class LevelStats(NamedTuple):
+    concurrency: int
+    rate: Optional[float]
+    latencies: List[float]
+    errors: int
+    elapsed: float
+
+    @property
+    def error_rate(self) -> float:
+        total = len(self.latencies) + self.errors
+        return self.errors / total if total > 0 else 0
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed > 0 else 0
+
+    @property
+    def saturated(self) -> bool:
+        """The sessions could not keep up with the requested rate."""
+        return self.rate is not None and self.throughput < self.concurrency * self.rate * 0.9
+
+    def percentile(self, value: float) -> float:
+        if len(self.latencies) == 0:
+            return float('nan')
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * value))]
+
+
+def run_level(connection_factory: Callable[[], Connection], concurrency: int, command: str,
+              commands: int, rate: Optional[float]) -> LevelStats:
+    latencies = []  # type: List[float]
+    errors = [0]
+    lock = threading.Lock()
+
+    def session():
+        connection = connection_factory()
+        interval = 1 / rate if rate else 0
+        try:
+            for _ in range(commands):
+                started = time.perf_counter()
+                try:
+                    connection.run_command(command)
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+                else:
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                pause = interval - (time.perf_counter() - started)
+                if pause > 0:
+                    time.sleep(pause)
+        finally:
+            connection.disconnect()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(session) for _ in range(concurrency)]:
+            future.result()
+
+    return LevelStats(concurrency, rate, latencies, errors[0], time.perf_counter() - started)
+
+
+def histogram(latencies: List[float]) -> str:
+    buckets = {}
+    for latency in latencies:
+        bucket = 1
+        while bucket < latency * 1000:
+            bucket *= 2
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+
+    return ' '.join('<=%dms:%d' % (bucket, count) for bucket, count in sorted(buckets.items()))
+
+
+def recommend(levels: List[LevelStats], degradation: float, max_error_rate: float) -> Optional[LevelStats]:
+    baseline = levels[0].percentile(0.95)
+    safe = None
+    for level in levels:
+        if level.error_rate > max_error_rate or level.percentile(0.95) > baseline * degradation \
+                or level.saturated:
+            break
+        safe = level
+    return safe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--simulate', action='store_true', help='use the simulated router')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int, default=23)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--command', default='show version')
+    parser.add_argument('--commands', type=int, default=50, help='commands per session and level')
+    parser.add_argument('--rate', type=float, help='max commands per second per session')
+    parser.add_argument('--max-concurrency', type=int, default=16)
+    parser.add_argument('--rates', type=float, nargs='+', help='ramp these per session rates instead of concurrency')
+    parser.add_argument('--concurrency', type=int, default=1, help='sessions while ramping the rate')
+    parser.add_argument('--degradation', type=float, default=2.0, help='allowed p95 growth over the baseline')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    if args.simulate:
+        router = SimulatedRouter()
+        factory = lambda: SimulatedConnection(router)  # noqa: E731
+    elif args.host:
+        factory = lambda: TelnetConnection(args.host, args.port, args.username, args.password)  # noqa: E731
+    else:
+        parser.error('either --simulate or --host is required')
+        return
+
+    if args.rates:
+        plan = [(args.concurrency, rate) for rate in sorted(args.rates)]
+    else:
+        plan = []
+        concurrency = 1
+        while concurrency <= args.max_concurrency:
+            plan.append((concurrency, args.rate))
+            concurrency *= 2
+
+    levels = []
+    for concurrency, rate in plan:
+        level = run_level(factory, concurrency, args.command, args.commands, rate)
+        levels.append(level)
+        print('sessions %3d rate %7s: p50 %7.1fms p95 %7.1fms p99 %7.1fms errors %5.1f%% %7.1f cmd/s' % (
+            concurrency, '%g/s' % rate if rate else 'max', level.percentile(0.5) * 1000,
+            level.percentile(0.95) * 1000, level.percentile(0.99) * 1000, level.error_rate * 100, level.throughput))
+        print('                          %s' % histogram(level.latencies))
+
+    safe = recommend(levels, args.degradation, args.max_error_rate)
+    if safe is None:
+        print('No safe level found, even the first one degrades or fails')
+    elif args.rates:
+        print('Recommended max rate with %d sessions: %g commands per second per session' % (
+            safe.concurrency, safe.rate))
+    else:
+        print('Recommended max concurrent sessions per router: %d' % safe.concurrency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""Times the parsers against responses captured with `RecordingConnection`.
+
+    python benchmarks/replay_benchmark.py capture.jsonl [--repeat 100] [--dump parsed.json]
+
+The dumped parse results can be diffed between releases to catch parser behaviour changes.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# noinspection PyProtectedMember
+from ndms2_client.client import _parse_collection_lines, _parse_dict_lines, _parse_table_lines, _ARP_REGEX
+
+
+def _parser(command: str):
+    if command == 'show ip arp':
+        return lambda lines: _parse_table_lines(lines, _ARP_REGEX)
+    if command == 'show interface':
+        return _parse_collection_lines
+    return _parse_dict_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture')
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--dump')
+    args = parser.parse_args()
+
+    with open(args.capture, 'r', encoding='UTF-8') as f:
+        records = [json.loads(line) for line in f if len(line.strip()) > 0]
+
+    parsed = []
+    for record in records:
+        if record.get('response') is None:
+            continue
+
+        parse = _parser(record['command'])
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            result = parse(record['response'])
+        elapsed = (time.perf_counter() - started) / args.repeat
+
+        parsed.append({'command': record['command'], 'result': result})
+        print('%-40s %6d lines %10.1f us' % (record['command'], len(record['response']), elapsed * 1e6))
+
+    if args.dump:
+        with open(args.dump, 'w', encoding='UTF-8') as f:
+            json.dump(parsed, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
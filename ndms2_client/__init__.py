@@ -1,2 +1,8 @@
-from .connection import Connection, ConnectionException, TelnetConnection
+from .exceptions import ConnectionException, ConnectionTimeoutException, AuthenticationException, \
+    CommandException, UnknownCommandException, RouterBusyException
+from .connection import Connection, TelnetConnection
 from .client import Client, Device, RouterInfo, InterfaceInfo
+from .retry import RetryPolicy
+from .latency import LatencyTracker
+from .schema import CommandSchema, Field
+from .cache import ParseCache
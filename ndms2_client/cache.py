@@ -0,0 +1,97 @@
+"""Cache of parse results keyed by a hash of the raw response.
+
+Routers often return byte identical responses between polls. Cached results are
+frozen: dicts and lists can not be modified, so a caller can not alter the result
+seen by other callers.
+"""
+import copy
+import threading
+import types
+from collections import OrderedDict
+from typing import Any, Callable, List, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+def _immutable(*_, **__):
+    raise TypeError('Cached parse results can not be modified')
+
+
+class FrozenDict(dict):
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    # copies and unpickled results are plain mutable dicts
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = sort = reverse = _immutable
+
+    # copies and unpickled results are plain mutable lists
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo) -> list:
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict) and not isinstance(value, FrozenDict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, types.GeneratorType)) and not isinstance(value, FrozenList):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+class ParseCache(object):
+    def __init__(self, maxsize: int = 128):
+        assert maxsize > 0, 'Cache size should be positive'
+
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # type: OrderedDict[Tuple[Any, bytes], Any]
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_parse(self, parser: Callable[[List[str]], T], lines: List[str]) -> T:
+        """Returns the frozen result of `parser(lines)`, parsing only responses not seen recently."""
+        import hashlib
+
+        key = (parser, hashlib.blake2b('\n'.join(lines).encode('UTF-8'), digest_size=16).digest())
+
+        with self._lock:
+            value = self._entries.get(key, self)
+            if value is not self:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = freeze(parser(lines))
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
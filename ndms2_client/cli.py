@@ -0,0 +1,125 @@
+"""Command line tool querying a fleet of routers in parallel.
+
+Results are printed as JSON lines, one per router, as soon as the router is done.
+The inventory is a JSON file with either a list of routers or an object like
+
+    {"defaults": {"port": 23, "username": "admin", "password": "secret"},
+     "routers": [{"name": "office", "host": "192.168.1.1"}]}
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .client import Client
+from .connection import Connection, TelnetConnection
+
+_QUERIES = {
+    'devices': lambda client, _: client.get_devices(),
+    'interfaces': lambda client, _: client.get_interfaces(),
+    'version': lambda client, _: client.get_router_info(),
+    'command': lambda client, command: client.run_command(command),
+}
+
+
+def load_inventory(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='UTF-8') as f:
+        inventory = json.load(f)
+
+    if isinstance(inventory, list):
+        inventory = {'routers': inventory}
+
+    defaults = {'port': 23, 'username': 'admin', 'password': ''}
+    defaults.update(inventory.get('defaults', {}))
+
+    routers = []
+    for entry in inventory.get('routers', []):
+        router = dict(defaults)
+        router.update(entry)
+        router.setdefault('name', router['host'])
+        routers.append(router)
+
+    return routers
+
+
+def telnet_connection(router: Dict[str, Any], timeout: float) -> Connection:
+    return TelnetConnection(router['host'], int(router['port']), router['username'], router['password'],
+                            timeout=timeout)
+
+
+def run_query(router: Dict[str, Any], query: str, argument: Optional[str], *,
+              timeout: float = 30,
+              connection_factory: Callable[[Dict[str, Any], float], Connection] = telnet_connection) -> dict:
+    started = time.monotonic()
+    result = {'router': router['name'], 'host': router.get('host'), 'query': query}
+    connection = None  # type: Optional[Connection]
+    try:
+        connection = connection_factory(router, timeout)
+        client = Client(connection)
+        with client.deadline(timeout):
+            result['result'] = _to_json(_QUERIES[query](client, argument))
+        result['ok'] = True
+    except Exception as e:
+        result['ok'] = False
+        result['error'] = '{}: {}'.format(type(e).__name__, str(e))
+    finally:
+        if connection is not None:
+            connection.disconnect()
+        result['elapsed'] = round(time.monotonic() - started, 4)
+
+    return result
+
+
+def run_inventory(routers: List[Dict[str, Any]], query: str, argument: Optional[str] = None, *,
+                  workers: int = 8, timeout: float = 30,
+                  connection_factory: Callable[[Dict[str, Any], float], Connection] = telnet_connection
+                  ) -> Iterator[dict]:
+    """Runs the query on all the routers, yielding results in completion order."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_query, router, query, argument,
+                                   timeout=timeout, connection_factory=connection_factory)
+                   for router in routers]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='ndms2', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-i', '--inventory', required=True, help='inventory JSON file')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='routers queried in parallel')
+    parser.add_argument('-t', '--timeout', type=float, default=30, help='time limit per router, seconds')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('query', choices=sorted(_QUERIES.keys()))
+    parser.add_argument('command', nargs='?', help='raw command for the `command` query')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.CRITICAL, stream=sys.stderr)
+
+    if args.query == 'command' and not args.command:
+        parser.error('the `command` query requires a command')
+
+    failed = 0
+    for result in run_inventory(load_inventory(args.inventory), args.query, args.command,
+                                workers=args.workers, timeout=args.timeout):
+        if not result['ok']:
+            failed += 1
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+    return 1 if failed > 0 else 0
+
+
+def _to_json(value: Any) -> Any:
+    if hasattr(value, '_asdict'):
+        return dict(value._asdict())
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    return value
+
+
+if __name__ == '__main__':
+    sys.exit(main())
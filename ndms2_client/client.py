@@ -1,8 +1,17 @@
 import logging
 import re
-from typing import Dict, List, Tuple, Union, NamedTuple, Optional
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple, Union, NamedTuple, Optional
 
+from . import profiling
+from .cache import ParseCache
 from .connection import Connection
+from .exceptions import CommandException, ConnectionTimeoutException, RouterBusyException, UnknownCommandException
+from .retry import RetryPolicy
+
+if TYPE_CHECKING:
+    from .schema import CommandSchema
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,7 +32,10 @@ _ARP_REGEX = re.compile(
     r'(?P<mac>(([0-9a-f]{2}[:-]){5}([0-9a-f]{2})))\s+' +
     r'(?P<interface>([^ ]+))\s+'
 )
+_COLLECTION_HEADER_REGEX = re.compile(r'^(\w+),\s*name\s*=\s*\"([^"]+)\"')
 _ERROR_REGEX = re.compile(r'error\[(?P<code>\d+)\]:\s*(?P<message>.*)')
+_UNKNOWN_COMMAND_REGEX = re.compile(r'no such command|unknown command|command not found', re.IGNORECASE)
+_ROUTER_BUSY_REGEX = re.compile(r'busy|try again|temporarily|locked', re.IGNORECASE)
 
 
 class Device(NamedTuple):
@@ -94,33 +106,57 @@ class InterfaceInfo(NamedTuple):
 
 
 class Client(object):
-    def __init__(self, connection: Connection):
+    def __init__(self, connection: Connection, *, retry_policy: Optional[RetryPolicy] = None,
+                 parse_cache: Optional[ParseCache] = None):
+        """
+            :param connection: connection to the router
+            :param retry_policy: policy for retrying read commands on transient failures.
+            Configuration changing commands are never retried.
+            :param parse_cache: cache of parse results for repeated responses, may be shared between clients.
+            Parsed structures returned from the cache are immutable.
+        """
         self._connection = connection
+        self._retry_policy = retry_policy
+        self._parse_cache = parse_cache
+        self._deadline = None  # type: Optional[float]
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """
+            Limits the overall time of all the commands run within the context
+            :param seconds: time limit, nested deadlines can only shorten it
+        """
+        previous = self._deadline
+        deadline = time.monotonic() + seconds
+        self._deadline = min(previous, deadline) if previous is not None else deadline
+        try:
+            yield
+        finally:
+            self._deadline = previous
 
     def get_router_info(self) -> RouterInfo:
-        info = _parse_dict_lines(self._connection.run_command(_VERSION_CMD))
+        info = self._parse(_parse_dict_lines, self._run_read(_VERSION_CMD))
 
-        _LOGGER.debug('Raw router info: %s', str(info))
+        _LOGGER.debug('Raw router info: %s', info)
         assert isinstance(info, dict), 'Router info response is not a dictionary'
 
-        return RouterInfo.from_dict(info)
+        return _from_dict(RouterInfo, info)
 
     def get_interfaces(self) -> List[InterfaceInfo]:
-        collection = _parse_collection_lines(self._connection.run_command(_INTERFACES_CMD))
-
-        _LOGGER.debug('Raw interfaces info: %s', str(collection))
-        assert isinstance(collection, list), 'Interfaces info response is not a collection'
+        return list(self.iter_interfaces())
 
-        return [InterfaceInfo.from_dict(info) for info in collection]
+    def iter_interfaces(self) -> Iterator[InterfaceInfo]:
+        """Yields interfaces one by one as they are parsed from the response."""
+        yield from self._parse(_iter_interfaces, self._run_read(_INTERFACES_CMD))
 
     def get_interface_info(self, interface_name) -> Optional[InterfaceInfo]:
-        info = _parse_dict_lines(self._connection.run_command(_INTERFACE_CMD % interface_name))
+        info = self._parse(_parse_dict_lines, self._run_read(_INTERFACE_CMD % interface_name))
 
-        _LOGGER.debug('Raw interface info: %s', str(info))
+        _LOGGER.debug('Raw interface info: %s', info)
         assert isinstance(info, dict), 'Interface info response is not a dictionary'
 
         if 'id' in info:
-            return InterfaceInfo.from_dict(info)
+            return _from_dict(InterfaceInfo, info)
 
         return None
 
@@ -149,29 +185,21 @@ class Client(object):
         return devices
 
     def get_hotspot_devices(self) -> List[Device]:
-        hotspot_info = self.__get_hotspot_info()
+        return list(self.iter_hotspot_devices())
 
-        return [Device(
-            mac=info.get('mac').upper(),
-            name=info.get('name'),
-            ip=info.get('ip'),
-            interface=info['interface'].get('name', '')
-        ) for info in hotspot_info.values() if 'interface' in info and info.get('link') == 'up']
+    def iter_hotspot_devices(self) -> Iterator[Device]:
+        """Yields online hotspot devices one by one as they are parsed from the response."""
+        yield from self._parse(_iter_hotspot_devices, self._run_read(_HOTSPOT_CMD))
 
     def get_arp_devices(self) -> List[Device]:
-        lines = self._connection.run_command(_ARP_CMD)
+        return list(self.iter_arp_devices())
 
-        result = _parse_table_lines(lines, _ARP_REGEX)
-
-        return [Device(
-            mac=info.get('mac').upper(),
-            name=info.get('name') or None,
-            ip=info.get('ip'),
-            interface=info.get('interface')
-        ) for info in result if info.get('mac') is not None]
+    def iter_arp_devices(self) -> Iterator[Device]:
+        """Yields ARP table devices one by one as they are parsed from the response."""
+        yield from self._parse(_iter_arp_devices, self._run_read(_ARP_CMD))
 
     def get_associated_devices(self):
-        associations = _parse_dict_lines(self._connection.run_command(_ASSOCIATIONS_CMD))
+        associations = self._parse(_parse_dict_lines, self._run_read(_ASSOCIATIONS_CMD))
 
         items = associations.get('station', [])
         if not isinstance(items, list):
@@ -181,7 +209,7 @@ class Client(object):
 
         ap_to_bridge = {}
         for ap in aps:
-            ap_info = _parse_dict_lines(self._connection.run_command(_INTERFACE_CMD % ap))
+            ap_info = self._parse(_parse_dict_lines, self._run_read(_INTERFACE_CMD % ap))
             ap_to_bridge[ap] = ap_info.get('group') or ap_info.get('interface-name')
 
         # try enriching the results with hotspot additional info
@@ -203,23 +231,109 @@ class Client(object):
 
         return devices
 
+    def query(self, schema: 'CommandSchema', *args) -> List[tuple]:
+        """
+            Runs a command declared with `CommandSchema`, returning typed records
+            :param schema: command declaration
+            :param args: values for the command placeholders
+            :return: list of schema records
+        """
+        return list(self._parse(schema.parse, self._run_read(schema.command.format(*args))))
+
+    def run_command(self, command: str) -> List[str]:
+        """Runs an arbitrary command, returning raw response lines. The command is never retried."""
+        return self._run_command(command)
+
     def save_configuration(self):
-        _check_command_result(self._connection.run_command(_SAVE_CONFIGURATION_CMD))
+        _check_command_result(self._run_command(_SAVE_CONFIGURATION_CMD))
 
     def commit_failsafe_configuration(self):
-        _check_command_result(self._connection.run_command(_FAILSAFE_COMMIT_CONFIGURATION_CMD))
+        _check_command_result(self._run_command(_FAILSAFE_COMMIT_CONFIGURATION_CMD))
 
     def set_interface_state(self, interface_id: str, is_up: bool):
         state_str = _INTERFACE_STATE_UP if is_up else _INTERFACE_STATE_DOWN
-        _check_command_result(self._connection.run_command(_SET_INTERFACE_STATE_CMD.format(
+        _check_command_result(self._run_command(_SET_INTERFACE_STATE_CMD.format(
             interface=interface_id,
             state=state_str
         )))
 
+    def set_interfaces_state(self, states: Dict[str, bool], *, save=True, failsafe_commit=False):
+        """
+            Changes state of several interfaces in one go.
+            Commands are not rolled back when some of them fail: nothing is saved then, and the raised
+            `CommandException` lists the failed commands in its message and the applied ones in `applied`.
+            A `ConnectionException` during the batch tells nothing about the commands applied before it.
+            :param states: mapping of interface id to the desired state (True for up)
+            :param save: save configuration once all the changes are applied
+            :param failsafe_commit: commit fail-safe configuration before saving
+            :return:
+        """
+        if len(states) == 0:
+            return
+
+        commands = [_SET_INTERFACE_STATE_CMD.format(
+            interface=interface_id,
+            state=_INTERFACE_STATE_UP if is_up else _INTERFACE_STATE_DOWN
+        ) for interface_id, is_up in states.items()]
+
+        applied = []
+        errors = []
+        if self._deadline is None:
+            responses = self._connection.run_commands(commands)
+        else:
+            responses = self._connection.run_commands(commands, timeout=self._remaining_time())
+
+        for command, lines in zip(commands, responses):
+            try:
+                _check_command_result(lines)
+            except CommandException as e:
+                errors.append((command, e))
+            else:
+                applied.append(command)
+
+        if len(errors) > 0:
+            _, error = errors[0]
+            raise type(error)(error.code, '; '.join('{}: {}'.format(c, e.message) for c, e in errors), applied)
+
+        if failsafe_commit:
+            self.commit_failsafe_configuration()
+
+        if save:
+            self.save_configuration()
+
+    def _parse(self, parser, lines: List[str]):
+        if self._parse_cache is None:
+            return parser(lines)
+
+        return self._parse_cache.get_or_parse(parser, lines)
+
+    def _remaining_time(self) -> float:
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise ConnectionTimeoutException('Deadline exceeded')
+        return remaining
+
+    def _run_command(self, command: str) -> List[str]:
+        profiler = profiling.active()
+        if profiler is not None:
+            profiler.set_command(command)
+
+        if self._deadline is None:
+            return self._connection.run_command(command)
+
+        return self._connection.run_command(command, timeout=self._remaining_time())
+
+    def _run_read(self, command: str) -> List[str]:
+        if self._retry_policy is None:
+            return _check_transient_error(self._run_command(command))
+
+        return self._retry_policy.call(lambda: _check_transient_error(self._run_command(command)),
+                                       deadline=self._deadline)
+
     # hotspot info is only available in newest firmware (2.09 and up) and in router mode
     # however missing command error will lead to empty dict returned
     def __get_hotspot_info(self):
-        info = _parse_dict_lines(self._connection.run_command(_HOTSPOT_CMD))
+        info = self._parse(_parse_dict_lines, self._run_read(_HOTSPOT_CMD))
 
         items = info.get('host', [])
         if not isinstance(items, list):
@@ -228,6 +342,34 @@ class Client(object):
         return {item.get('mac'): item for item in items}
 
 
+def _iter_interfaces(lines: List[str]) -> Iterator[InterfaceInfo]:
+    for info in _iter_collection_lines(lines):
+        _LOGGER.debug('Raw interface info: %s', info)
+        yield _from_dict(InterfaceInfo, info)
+
+
+def _iter_hotspot_devices(lines: List[str]) -> Iterator[Device]:
+    for info in _iter_dict_items(lines, 'host'):
+        if isinstance(info.get('interface'), dict) and info.get('link') == 'up':
+            yield Device(
+                mac=info.get('mac').upper(),
+                name=info.get('name'),
+                ip=info.get('ip'),
+                interface=info['interface'].get('name', '')
+            )
+
+
+def _iter_arp_devices(lines: List[str]) -> Iterator[Device]:
+    for info in _iter_table_lines(lines, _ARP_REGEX):
+        if info.get('mac') is not None:
+            yield Device(
+                mac=info.get('mac').upper(),
+                name=info.get('name') or None,
+                ip=info.get('ip'),
+                interface=info.get('interface')
+            )
+
+
 def _str(value: Optional[any]) -> Optional[str]:
     if value is None:
         return None
@@ -242,6 +384,17 @@ def _int(value: Optional[any]) -> Optional[int]:
     return int(value)
 
 
+def _from_dict(record_type, info: dict):
+    profiler = profiling.active()
+    if profiler is None:
+        return record_type.from_dict(info)
+
+    started = time.perf_counter()
+    record = record_type.from_dict(info)
+    profiler.record(profiling.STAGE_FROM_DICT, started)
+    return record
+
+
 def _merge_devices(*lists: List[Device]) -> List[Device]:
     res = {}
     for l in lists:
@@ -265,17 +418,42 @@ def _parse_table_lines(lines: List[str], regex: re) -> List[Dict[str, any]]:
     """Parse the lines using the given regular expression.
      If a line can't be parsed it is logged and skipped in the output.
     """
-    results = []
-    for line in lines:
-        match = regex.search(line)
-        if not match:
-            _LOGGER.debug('Could not parse line: %s', line)
-            continue
-        results.append(match.groupdict())
-    return results
+    return list(_iter_table_lines(lines, regex))
+
+
+def _iter_table_lines(lines: List[str], regex: re) -> Iterator[Dict[str, any]]:
+    profiler = profiling.active()
+    if profiler is None:
+        for line in lines:
+            match = regex.search(line)
+            if not match:
+                _LOGGER.debug('Could not parse line: %s', line)
+                continue
+            yield match.groupdict()
+        return
+
+    # time spent by the consumer between items is not attributed to parsing
+    elapsed = 0.0
+    count = 0
+    try:
+        for line in lines:
+            started = time.perf_counter()
+            match = regex.search(line)
+            result = match.groupdict() if match else None
+            elapsed += time.perf_counter() - started
+            count += 1
+            if result is None:
+                _LOGGER.debug('Could not parse line: %s', line)
+                continue
+            yield result
+    finally:
+        profiler.add(profiling.STAGE_PARSE_TABLE, elapsed, count)
 
 
 def _fix_continuation_lines(lines: List[str]) -> List[str]:
+    profiler = profiling.active()
+    started = time.perf_counter() if profiler is not None else 0
+
     indent = 0
     continuation_possible = False
     fixed_lines = []  # type: List[str]
@@ -297,6 +475,9 @@ def _fix_continuation_lines(lines: List[str]) -> List[str]:
 
         fixed_lines.append(line)
 
+    if profiler is not None:
+        profiler.record(profiling.STAGE_FIX_CONTINUATION, started, len(lines))
+
     return fixed_lines
 
 
@@ -306,11 +487,18 @@ def _parse_dict_lines(lines: List[str]) -> Dict[str, any]:
     stack = [(None, indent, response)]  # type: List[Tuple[str, int, Union[str, dict]]]
     stack_level = 0
 
-    for line in _fix_continuation_lines(lines):
+    fixed_lines = _fix_continuation_lines(lines)
+
+    profiler = profiling.active()
+    started = time.perf_counter() if profiler is not None else 0
+    debug = _LOGGER.isEnabledFor(logging.DEBUG)
+
+    for line in fixed_lines:
         if len(line.strip()) == 0:
             continue
 
-        _LOGGER.debug(line)
+        if debug:
+            _LOGGER.debug(line)
 
         # exploding the line
         colon_pos = line.index(':')
@@ -375,36 +563,90 @@ def _parse_dict_lines(lines: List[str]) -> Dict[str, any]:
         else:
             obj[key] = value
 
+    if profiler is not None:
+        profiler.record(profiling.STAGE_PARSE_DICT, started, len(fixed_lines))
+
     return response
 
 
 def _parse_collection_lines(lines: List[str]) -> List[Dict[str, any]]:
-    _HEADER_REGEXP = re.compile(r'^(\w+),\s*name\s*=\s*\"([^"]+)\"')
+    return list(_iter_collection_lines(lines))
+
 
-    result = []
+def _iter_collection_lines(lines: List[str]) -> Iterator[Dict[str, any]]:
     item_lines = []  # type: List[str]
     for line in lines:
         if len(line.strip()) == 0:
             continue
 
-        match = _HEADER_REGEXP.match(line)
+        match = _COLLECTION_HEADER_REGEX.match(line)
         if match:
             if len(item_lines) > 0:
-                result.append(_parse_dict_lines(item_lines))
+                yield _parse_dict_lines(item_lines)
                 item_lines = []
         else:
             item_lines.append(line)
 
     if len(item_lines) > 0:
-        result.append(_parse_dict_lines(item_lines))
+        yield _parse_dict_lines(item_lines)
+
+
+def _iter_dict_items(lines: List[str], key: str) -> Iterator[Dict[str, any]]:
+    """Yield values of the repeated top level `key` of a dict response, parsing one entry at a time."""
+    top_indent = None
+    item_lines = []  # type: List[str]
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+
+        if ':' in line:
+            colon_pos = line.index(':')
+            comma_pos = line.index(',') if ',' in line[:colon_pos] else None
+            indent = comma_pos if comma_pos is not None else colon_pos
+            if top_indent is None:
+                top_indent = indent
+
+            if indent == top_indent and line[:indent].strip() == key and len(item_lines) > 0:
+                yield from _dict_item_values(item_lines, key)
+                item_lines = []
+
+        item_lines.append(line)
+
+    if len(item_lines) > 0:
+        yield from _dict_item_values(item_lines, key)
+
 
-    return result
+def _dict_item_values(lines: List[str], key: str) -> Iterator[Dict[str, any]]:
+    value = _parse_dict_lines(lines).get(key)
+    for item in (value if isinstance(value, list) else [value]):
+        if isinstance(item, dict):
+            yield item
+
+
+def _command_error(code: int, message: str) -> CommandException:
+    if _UNKNOWN_COMMAND_REGEX.search(message):
+        return UnknownCommandException(code, message)
+    if _ROUTER_BUSY_REGEX.search(message):
+        return RouterBusyException(code, message)
+    return CommandException(code, message)
 
 
 def _check_command_result(lines: List[str]) -> List[str]:
     for line in lines:
         match = _ERROR_REGEX.search(line)
         if match:
-            raise Exception('Command failed with error {}: {}'.format(match.group('code'), match.group('message')))
+            raise _command_error(int(match.group('code')), match.group('message'))
+
+    return lines
+
+
+def _check_transient_error(lines: List[str]) -> List[str]:
+    """Raise for router busy errors only, other errors are handled by response parsing."""
+    for line in lines:
+        match = _ERROR_REGEX.search(line)
+        if match:
+            error = _command_error(int(match.group('code')), match.group('message'))
+            if isinstance(error, RouterBusyException):
+                raise error
 
     return lines
@@ -1,13 +1,21 @@
 import logging
 import re
-from telnetlib import Telnet
-from typing import List, Union, Pattern, Match
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Union, Pattern, Match
+
+from .exceptions import AuthenticationException, CommandException, ConnectionException, ConnectionTimeoutException
+from .latency import LatencyTracker
+from .tracing import trace_response
 
 _LOGGER = logging.getLogger(__name__)
 
+_PROMPT_REGEX = re.compile(br'\n\(\w+[-\w]+\)>[ \t]*')
+_LOGIN_FAILED_REGEX = re.compile(br'Login incorrect|Login: ')
+_PATTERN_TYPE = type(_PROMPT_REGEX)
 
-class ConnectionException(Exception):
-    pass
+if TYPE_CHECKING:
+    from telnetlib import Telnet
 
 
 class Connection(object):
@@ -15,98 +23,260 @@ class Connection(object):
     def connected(self) -> bool:
         raise NotImplementedError("Should have implemented this")
 
-    def connect(self):
+    def connect(self, *, timeout: Optional[float] = None):
         raise NotImplementedError("Should have implemented this")
 
     def disconnect(self):
         raise NotImplementedError("Should have implemented this")
 
-    def run_command(self, command: str) -> List[str]:
+    def run_command(self, command: str, *, timeout: Optional[float] = None) -> List[str]:
         raise NotImplementedError("Should have implemented this")
 
+    def run_commands(self, commands: List[str], *, timeout: Optional[float] = None) -> List[List[str]]:
+        if timeout is None:
+            return [self.run_command(command) for command in commands]
+
+        deadline = time.monotonic() + timeout
+        return [self.run_command(command, timeout=_remaining(deadline)) for command in commands]
+
 
 class TelnetConnection(Connection):
     """Maintains a Telnet connection to a router."""
 
     def __init__(self, host: str, port: int, username: str, password: str, *,
-                 timeout: int = 30):
-        """Initialize the Telnet connection properties."""
+                 timeout: int = 30, latency_tracker: Optional[LatencyTracker] = None):
+        """Initialize the Telnet connection properties.
+         With a latency tracker given, command timeouts adapt to the observed latency
+         of the router, `timeout` is then used as the upper bound.
+        """
         self._telnet = None  # type: Telnet
         self._host = host
         self._port = port
         self._username = username
         self._password = password
         self._timeout = timeout
+        self._latency_tracker = latency_tracker
         self._current_prompt_string = None  # type: bytes
+        self._parent_prompt_strings = []  # type: List[bytes]
+        self._group_prompt_strings = {}  # type: Dict[str, bytes]
+        self._buffer_clean = False
 
     @property
     def connected(self):
         return self._telnet is not None
 
-    def run_command(self, command, *, group_change_expected=False) -> List[str]:
+    def run_command(self, command, *, group_change_expected=False, timeout: Optional[float] = None) -> List[str]:
         """Run a command through a Telnet connection.
          Connect to the Telnet server if not currently connected, otherwise
          use the existing connection.
+         :param group_change_expected: the command changes the CLI group, so the prompt is detected anew
+         :param timeout: overall time limit for the call, including connecting
         """
-        if not self._telnet:
-            self.connect()
+        deadline = self._connect_for(timeout)
+
+        needle = _PROMPT_REGEX if group_change_expected else self._current_prompt_string
+        (_, match, response) = self._execute(command, [needle], deadline)
+        if group_change_expected:
+            self._current_prompt_string = match[0]
+            self._parent_prompt_strings = []
+
+        return response
+
+    def run_commands(self, commands: List[str], *, timeout: Optional[float] = None) -> List[List[str]]:
+        """Run several commands through a Telnet connection.
+         All commands are written at once and the responses are read back afterwards,
+         so the router does not wait for a round trip between commands.
+         Commands changing the CLI group are not supported here.
+        """
+        deadline = self._connect_for(timeout)
 
         try:
-            self._telnet.read_very_eager()  # this is here to flush the read buffer
-            self._telnet.write('{}\n'.format(command).encode('UTF-8'))
-            response = self._read_response(group_change_expected)
+            self._flush()
+            started = time.monotonic()
+            self._telnet.write(''.join('{}\n'.format(command) for command in commands).encode('UTF-8'))
+            responses = []
+            for command in commands:
+                (_, _, text) = self._expect_response(command, [self._current_prompt_string], deadline)
+                responses.append(_response_lines(text))
+                finished = time.monotonic()
+                self._record_latency(command, finished - started)
+                started = finished
+            self._buffer_clean = self._buffer_empty()
         except Exception as e:
-            message = "Error executing command: %s" % str(e)
+            message = "Error executing commands: %s" % str(e)
             _LOGGER.error(message)
             self.disconnect()
-            raise ConnectionException(message) from None
+            raise _connection_exception_type(e)(message) from None
         else:
-            _LOGGER.debug('Command %s: %s', command, '\n'.join(response))
-            return response
+            for command, response in zip(commands, responses):
+                trace_response(_LOGGER, command, response)
+            return responses
+
+    def enter_group(self, command: str, *, timeout: Optional[float] = None) -> List[str]:
+        """Enter a configuration group, like `interface Bridge0`.
+         The prompt of a group is detected once per command without its last argument and reused afterwards,
+         any other prompt is still accepted in case groups sharing the command differ.
+        """
+        deadline = self._connect_for(timeout)
+
+        key = command.rsplit(None, 1)[0]
+        parent_prompt = self._current_prompt_string
+        known_prompt = self._group_prompt_strings.get(key)
+        needles = [parent_prompt, known_prompt, _PROMPT_REGEX] if known_prompt is not None else [_PROMPT_REGEX]
+
+        (_, match, response) = self._execute(command, needles, deadline)
+        if match[0] == parent_prompt:
+            raise CommandException(0, 'Failed to enter group `{}`: {}'.format(command, ' '.join(response).strip()))
+
+        self._group_prompt_strings[key] = match[0]
+        self._parent_prompt_strings.append(parent_prompt)
+        self._current_prompt_string = match[0]
+        return response
 
-    def connect(self):
-        """Connect to the Telnet server."""
+    def exit_group(self, *, timeout: Optional[float] = None) -> List[str]:
+        """Leave the current configuration group."""
+        assert len(self._parent_prompt_strings) > 0, 'Not in a configuration group'
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        parent_prompt = self._parent_prompt_strings[-1]
+        (_, _, response) = self._execute('exit', [parent_prompt], deadline)
+        self._parent_prompt_strings.pop()
+        self._current_prompt_string = parent_prompt
+        return response
+
+    @contextmanager
+    def group(self, command: str, *, timeout: Optional[float] = None):
+        """Run the commands of the context within a configuration group."""
+        self.enter_group(command, timeout=timeout)
+        depth = len(self._parent_prompt_strings)
         try:
+            yield self
+        finally:
+            if self.connected and len(self._parent_prompt_strings) == depth:
+                self.exit_group(timeout=timeout)
+
+    def connect(self, *, timeout: Optional[float] = None):
+        """Connect to the Telnet server.
+         :param timeout: overall time limit for connecting and logging in
+        """
+        deadline = time.monotonic() + min(timeout, self._timeout) if timeout is not None else None
+        try:
+            # imported on first use as telnetlib is deprecated and is not needed for other transports
+            from telnetlib import Telnet
+
             self._telnet = Telnet()
             self._telnet.set_option_negotiation_callback(TelnetConnection.__negotiate_naws)
-            self._telnet.open(self._host, self._port, self._timeout)
+            self._telnet.open(self._host, self._port, self._limit_timeout(deadline))
 
-            self._read_until(b'Login: ')
+            self._read_until(b'Login: ', self._limit_timeout(deadline))
             self._telnet.write((self._username + '\n').encode('UTF-8'))
-            self._read_until(b'Password: ')
+            self._read_until(b'Password: ', self._limit_timeout(deadline))
             self._telnet.write((self._password + '\n').encode('UTF-8'))
 
-            self._read_response(True)
+            self._read_login_result(self._limit_timeout(deadline))
             self._set_max_window_size()
         except Exception as e:
             message = "Error connecting to telnet server: %s" % str(e)
             _LOGGER.error(message)
             self._telnet = None
-            raise ConnectionException(message) from None
+            raise _connection_exception_type(e)(message) from None
 
     def disconnect(self):
         """Disconnect the current Telnet connection."""
         try:
             if self._telnet:
-                self._telnet.write(b'exit\n')
+                self._telnet.write(b'exit\n' * (len(self._parent_prompt_strings) + 1))
         except Exception as e:
             _LOGGER.error("Telnet error on exit: %s" % str(e))
             pass
         self._telnet = None
+        self._parent_prompt_strings = []
+        self._buffer_clean = False
 
-    def _read_response(self, detect_new_prompt_string=False) -> List[str]:
-        needle = re.compile(br'\n\(\w+[-\w]+\)>') if detect_new_prompt_string else self._current_prompt_string
-        (match, text) = self._read_until(needle)
-        if detect_new_prompt_string:
-            self._current_prompt_string = match[0]
-        return text.decode('UTF-8').split('\n')[1:-1]
+    def _connect_for(self, timeout: Optional[float]) -> Optional[float]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        if not self._telnet:
+            self.connect(timeout=timeout)
 
-    def _read_until(self, needle: Union[bytes, Pattern]) -> (Match, bytes):
-        matcher = needle if isinstance(needle, Pattern) else re.escape(needle)
-        (i, match, text) = self._telnet.expect([matcher], self._timeout)
-        assert i == 0, "No expected response from server"
+        return deadline
+
+    def _execute(self, command: str, needles: List[Union[bytes, Pattern]],
+                 deadline: Optional[float]) -> (int, Match, List[str]):
+        try:
+            self._flush()
+            started = time.monotonic()
+            self._telnet.write('{}\n'.format(command).encode('UTF-8'))
+            (i, match, text) = self._expect_response(command, needles, deadline)
+            self._record_latency(command, time.monotonic() - started)
+            self._buffer_clean = self._buffer_empty()
+        except Exception as e:
+            message = "Error executing command: %s" % str(e)
+            _LOGGER.error(message)
+            self.disconnect()
+            raise _connection_exception_type(e)(message) from None
+        else:
+            response = _response_lines(text)
+            trace_response(_LOGGER, command, response)
+            return i, match, response
+
+    def _flush(self):
+        # the router prints nothing after the prompt unprompted, so the socket is only polled after a response
+        # left bytes behind or after an error; unsolicited output arriving between commands, like a syslog
+        # line printed to the session, then ends up at the start of the next response instead of being dropped
+        if not self._buffer_clean:
+            self._telnet.read_very_eager()
+
+    # noinspection PyProtectedMember
+    def _buffer_empty(self) -> bool:
+        # only telnetlib's own queues are checked, polling the socket here would cost the syscall the flush saves
+        return len(self._telnet.cookedq) == 0 and self._telnet.irawq >= len(self._telnet.rawq)
+
+    def _limit_timeout(self, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return self._timeout
+        return min(self._timeout, _remaining(deadline))
+
+    def _command_timeout(self, command: str, deadline: Optional[float]) -> float:
+        timeout = self._limit_timeout(deadline)
+        if self._latency_tracker is not None:
+            timeout = self._latency_tracker.timeout(command, timeout)
+        return timeout
+
+    def _expect_response(self, command: str, needles: List[Union[bytes, Pattern]],
+                         deadline: Optional[float]) -> (int, Match, bytes):
+        timeout = self._command_timeout(command, deadline)
+        try:
+            return self._expect(needles, timeout)
+        except ConnectionTimeoutException:
+            # the command took at least this long, so an adaptive timeout grows if the router got slower
+            self._record_latency(command, timeout)
+            raise
+
+    def _record_latency(self, command: str, elapsed: float):
+        if self._latency_tracker is not None:
+            self._latency_tracker.record(command, elapsed)
+
+    def _read_login_result(self, timeout: float):
+        (i, match, _) = self._telnet.expect([_PROMPT_REGEX, _LOGIN_FAILED_REGEX], timeout)
+        if i < 0:
+            raise ConnectionTimeoutException("No prompt received after login")
+        if i == 1:
+            raise AuthenticationException("Login incorrect")
+        self._current_prompt_string = match[0]
+        self._parent_prompt_strings = []
+
+    def _read_until(self, needle: Union[bytes, Pattern], timeout: Optional[float] = None) -> (Match, bytes):
+        (_, match, text) = self._expect([needle], timeout)
         return match, text
 
+    def _expect(self, needles: List[Union[bytes, Pattern]], timeout: Optional[float] = None) -> (int, Match, bytes):
+        matchers = [needle if isinstance(needle, _PATTERN_TYPE) else re.escape(needle) for needle in needles]
+        (i, match, text) = self._telnet.expect(matchers, timeout if timeout is not None else self._timeout)
+        if i < 0:
+            raise ConnectionTimeoutException("No expected response from server")
+        return i, match, text
+
     # noinspection PyProtectedMember
     def _set_max_window_size(self):
         """
@@ -139,3 +309,25 @@ class TelnetConnection(Connection):
             tsocket.sendall(IAC + WONT + option)
         elif command in (WILL, WONT):
             tsocket.sendall(IAC + DONT + option)
+
+
+def _connection_exception_type(error: Exception) -> type:
+    import socket
+
+    if isinstance(error, ConnectionException):
+        return type(error)
+    if isinstance(error, socket.timeout):
+        return ConnectionTimeoutException
+    return ConnectionException
+
+
+def _response_lines(text: bytes) -> List[str]:
+    # the first line is the command echo and the last one is the prompt
+    return text.decode('UTF-8').split('\n')[1:-1]
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ConnectionTimeoutException("Deadline exceeded")
+    return remaining
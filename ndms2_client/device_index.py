@@ -0,0 +1,157 @@
+"""Fleet wide index of devices keyed by MAC address.
+
+Observations from different routers and sources (hotspot, ARP, associations, events)
+are merged per device. The device is located at the router of its most recent
+observation, so roaming between routers and access points is followed.
+"""
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .client import Client, Device
+
+SOURCE_HOTSPOT = 'hotspot'
+SOURCE_ARP = 'arp'
+SOURCE_ASSOCIATIONS = 'associations'
+
+
+class DeviceLocation(NamedTuple):
+    mac: str
+    router: str
+    interface: Optional[str]
+    name: Optional[str]
+    ip: Optional[str]
+    sources: FrozenSet[str]
+    last_seen: float
+
+
+class _Observation(NamedTuple):
+    device: Device
+    last_seen: float
+
+
+def normalize_mac(mac: str) -> str:
+    return mac.strip().upper().replace('-', ':')
+
+
+class DeviceIndex(object):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._observations = {}  # type: Dict[str, Dict[Tuple[str, str], _Observation]]
+        self._locations = {}  # type: Dict[str, DeviceLocation]
+        self._snapshots = {}  # type: Dict[Tuple[str, str], Set[str]]
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, mac: str) -> bool:
+        return normalize_mac(mac) in self._locations
+
+    def locate(self, mac: str) -> Optional[DeviceLocation]:
+        return self._locations.get(normalize_mac(mac))
+
+    def observation(self, router: str, mac: str, source: str) -> Optional[Device]:
+        """Returns the device as last observed by the router according to the source."""
+        observation = self._observations.get(normalize_mac(mac), {}).get((router, source))
+        return observation.device if observation is not None else None
+
+    def devices(self, router: Optional[str] = None) -> List[DeviceLocation]:
+        with self._lock:
+            locations = list(self._locations.values())
+
+        if router is None:
+            return locations
+        return [location for location in locations if location.router == router]
+
+    def observe(self, router: str, device: Device, source: str, timestamp: Optional[float] = None):
+        """Records a single device seen by the router according to the source."""
+        timestamp = time.time() if timestamp is None else timestamp
+        mac = normalize_mac(device.mac)
+
+        with self._lock:
+            self._observations.setdefault(mac, {})[(router, source)] = _Observation(device, timestamp)
+            self._snapshots.setdefault((router, source), set()).add(mac)
+            self._refresh(mac)
+
+    def update(self, router: str, devices: Iterable[Device], source: str, timestamp: Optional[float] = None):
+        """Replaces all the devices seen by the router according to the source, like a full poll result."""
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            previous = self._snapshots.get((router, source), set())
+            current = set()
+            for device in devices:
+                mac = normalize_mac(device.mac)
+                current.add(mac)
+                self._observations.setdefault(mac, {})[(router, source)] = _Observation(device, timestamp)
+                self._refresh(mac)
+
+            for mac in previous - current:
+                self._remove(mac, router, source)
+
+            self._snapshots[(router, source)] = current
+
+    def poll(self, router: str, client: Client, timestamp: Optional[float] = None):
+        """Updates the router devices the same way `Client.get_devices` collects them, keeping the sources apart."""
+        hotspot_devices = client.get_hotspot_devices()
+        self.update(router, hotspot_devices, SOURCE_HOTSPOT, timestamp)
+        if len(hotspot_devices) > 0:
+            # the hotspot list supersedes the fallbacks, so devices seen there earlier must not linger
+            self.update(router, [], SOURCE_ARP, timestamp)
+            self.update(router, [], SOURCE_ASSOCIATIONS, timestamp)
+            return
+
+        self.update(router, client.get_arp_devices(), SOURCE_ARP, timestamp)
+        self.update(router, client.get_associated_devices(), SOURCE_ASSOCIATIONS, timestamp)
+
+    def forget(self, router: str, mac: str, source: Optional[str] = None):
+        """Removes the device observations of the router, from all sources unless one is given."""
+        mac = normalize_mac(mac)
+
+        with self._lock:
+            sources = [key[1] for key in self._observations.get(mac, {}) if key[0] == router]
+            for observed_source in sources:
+                if source is None or observed_source == source:
+                    self._snapshots.get((router, observed_source), set()).discard(mac)
+                    self._remove(mac, router, observed_source)
+
+    def expire(self, max_age: float, now: Optional[float] = None):
+        """Removes observations older than `max_age` seconds."""
+        limit = (time.time() if now is None else now) - max_age
+
+        with self._lock:
+            stale = [(mac, key) for mac, observations in self._observations.items()
+                     for key, observation in observations.items() if observation.last_seen < limit]
+            for mac, (router, source) in stale:
+                self._snapshots.get((router, source), set()).discard(mac)
+                self._remove(mac, router, source)
+
+    def _remove(self, mac: str, router: str, source: str):
+        observations = self._observations.get(mac)
+        if observations is None:
+            return
+
+        observations.pop((router, source), None)
+        if len(observations) == 0:
+            del self._observations[mac]
+            self._locations.pop(mac, None)
+        else:
+            self._refresh(mac)
+
+    def _refresh(self, mac: str):
+        observations = self._observations[mac]
+        (router, _), latest = max(observations.items(), key=lambda item: item[1].last_seen)
+
+        # prefer details known on the current router, then the most recent ones elsewhere
+        ordered = sorted(observations.items(), key=lambda item: (item[0][0] == router, item[1].last_seen),
+                         reverse=True)
+
+        self._locations[mac] = DeviceLocation(
+            mac=mac,
+            router=router,
+            interface=next((o.device.interface for (r, _), o in ordered if r == router and o.device.interface), None),
+            name=next((o.device.name for _, o in ordered if o.device.name), None),
+            ip=next((o.device.ip for _, o in ordered if o.device.ip), None),
+            sources=frozenset(source for (r, source) in observations if r == router),
+            last_seen=latest.last_seen,
+        )
@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+
+class ConnectionException(Exception):
+    pass
+
+
+class ConnectionTimeoutException(ConnectionException):
+    pass
+
+
+class AuthenticationException(ConnectionException):
+    pass
+
+
+class CommandException(Exception):
+    def __init__(self, code: int, message: str, applied: Optional[List[str]] = None):
+        """
+            :param applied: commands of the same batch applied before the failure
+        """
+        super().__init__('Command failed with error {}: {}'.format(code, message))
+        self.code = code
+        self.message = message
+        self.applied = applied if applied is not None else []  # type: List[str]
+
+
+class UnknownCommandException(CommandException):
+    pass
+
+
+class RouterBusyException(CommandException):
+    pass
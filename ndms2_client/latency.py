@@ -0,0 +1,40 @@
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker(object):
+    """Tracks observed command latencies of a single router and derives command timeouts from them.
+     Until enough samples are collected for a command the default timeout is used.
+    """
+
+    def __init__(self, *, window: int = 50, min_samples: int = 10, percentile: float = 0.95,
+                 multiplier: float = 4.0, min_timeout: float = 1.0):
+        assert 0 < percentile <= 1, 'Percentile should be between 0 and 1'
+
+        self._window = window
+        self._min_samples = min_samples
+        self._percentile = percentile
+        self._multiplier = multiplier
+        self._min_timeout = min_timeout
+        self._samples = {}  # type: Dict[str, Deque[float]]
+
+    def record(self, command: str, elapsed: float):
+        samples = self._samples.get(command)
+        if samples is None:
+            samples = self._samples[command] = deque(maxlen=self._window)
+        samples.append(elapsed)
+
+    def percentile(self, command: str) -> Optional[float]:
+        samples = self._samples.get(command)
+        if samples is None or len(samples) < self._min_samples:
+            return None
+
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self._percentile))]
+
+    def timeout(self, command: str, default: float) -> float:
+        value = self.percentile(command)
+        if value is None:
+            return default
+
+        return min(default, max(self._min_timeout, value * self._multiplier))
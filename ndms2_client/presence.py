@@ -0,0 +1,219 @@
+"""Event driven device presence.
+
+Routers can send their log to a syslog server. Association and DHCP messages from the
+log update a `DeviceIndex` as they arrive, while full device polls only run at a low
+rate to reconcile missed events. Log messages name access points while polls report
+bridges, so the access point of a device is kept by its tracker instead of the index.
+"""
+import logging
+import re
+import socket
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional
+
+from .client import Client, Device
+from .device_index import DeviceIndex, normalize_mac
+
+_LOGGER = logging.getLogger(__name__)
+
+SOURCE_EVENTS = 'events'
+
+EVENT_JOIN = 'join'
+EVENT_LEAVE = 'leave'
+
+_MAC = r'(?P<mac>([0-9a-f]{2}[:-]){5}[0-9a-f]{2})'
+_IP = r'(?P<ip>([0-9]{1,3}[.]){3}[0-9]{1,3})'
+_EVENT_PATTERNS = (
+    (EVENT_JOIN, re.compile(r'(?P<interface>[\w/]+): STA\(' + _MAC + r'\) had associated', re.IGNORECASE)),
+    (EVENT_LEAVE, re.compile(r'(?P<interface>[\w/]+): STA\(' + _MAC + r'\) had (deauthenticated|disassociated)',
+                             re.IGNORECASE)),
+    (EVENT_JOIN, re.compile(r'Dhcp::Server: sending ACK of ' + _IP + ' to ' + _MAC, re.IGNORECASE)),
+)
+_SYSLOG_PRIORITY_REGEX = re.compile(r'^<\d+>')
+
+
+class PresenceEvent(NamedTuple):
+    kind: str
+    mac: str
+    interface: Optional[str]
+    ip: Optional[str]
+
+
+def parse_event(line: str) -> Optional[PresenceEvent]:
+    for kind, regex in _EVENT_PATTERNS:
+        match = regex.search(line)
+        if match:
+            info = match.groupdict()
+            return PresenceEvent(kind=kind, mac=info['mac'].upper(), interface=info.get('interface'),
+                                 ip=info.get('ip'))
+
+    return None
+
+
+class PresenceTracker(object):
+    """Applies log events of a single router to the device index."""
+
+    def __init__(self, router: str, index: DeviceIndex, client: Optional[Client] = None, *,
+                 reconcile_interval: float = 600,
+                 clock: Callable[[], float] = time.time):
+        """
+            :param router: router name in the index
+            :param index: device index to update
+            :param client: client used for periodic full polls
+            :param reconcile_interval: seconds between full polls
+        """
+        self.router = router
+        self._index = index
+        self._client = client
+        self._reconcile_interval = reconcile_interval
+        self._clock = clock
+        self._last_reconcile = None  # type: Optional[float]
+        self._reconciling = threading.Lock()
+        self._lock = threading.Lock()
+        self._access_points = {}  # type: Dict[str, str]
+
+    def handle_line(self, line: str) -> Optional[PresenceEvent]:
+        event = parse_event(line)
+        if event is not None:
+            self.handle_event(event)
+        return event
+
+    def access_point(self, mac: str) -> Optional[str]:
+        """Returns the access point the device last associated with according to the log."""
+        return self._access_points.get(normalize_mac(mac))
+
+    def handle_event(self, event: PresenceEvent):
+        mac = normalize_mac(event.mac)
+
+        if event.kind == EVENT_LEAVE:
+            with self._lock:
+                access_point = self._access_points.get(mac)
+                # after a roam between access points the old one reports the leave after the new one the join
+                if access_point is not None and access_point != event.interface:
+                    return
+                self._access_points.pop(mac, None)
+            self._index.forget(self.router, mac)
+            return
+
+        if event.interface is not None:
+            with self._lock:
+                self._access_points[mac] = event.interface
+
+        # the bridge of the device is left to the polls, DHCP events carry the IP only
+        known = self._index.observation(self.router, mac, SOURCE_EVENTS)
+        self._index.observe(self.router, Device(
+            mac=mac,
+            name=None,
+            ip=event.ip or (known.ip if known is not None else None),
+            interface=None,
+        ), SOURCE_EVENTS, self._clock())
+
+    def reconcile(self):
+        """Replaces the router devices with a full poll result."""
+        now = self._clock()
+        self._last_reconcile = now
+        self._index.poll(self.router, self._client, now)
+
+        # the poll covers devices known from events, the ones it missed have left unnoticed
+        self._index.update(self.router, [], SOURCE_EVENTS, now)
+        present = set(location.mac for location in self._index.devices(self.router))
+        with self._lock:
+            for mac in [mac for mac in self._access_points if mac not in present]:
+                del self._access_points[mac]
+
+    def maybe_reconcile(self, executor: Optional[Executor] = None) -> bool:
+        """Reconciles if due, returns whether a reconciliation was run or, with an executor given, submitted."""
+        if self._client is None:
+            return False
+        now = self._clock()
+        if self._last_reconcile is not None and now - self._last_reconcile < self._reconcile_interval:
+            return False
+        if not self._reconciling.acquire(blocking=False):
+            return False
+
+        # marked due right away, so a submitted reconciliation is not submitted again while it waits
+        self._last_reconcile = now
+        if executor is None:
+            self._reconcile_logged()
+        else:
+            try:
+                executor.submit(self._reconcile_logged)
+            except Exception:
+                self._reconciling.release()
+                raise
+        return True
+
+    def _reconcile_logged(self):
+        try:
+            self.reconcile()
+        except Exception as e:
+            _LOGGER.error('Failed to reconcile devices of %s: %s', self.router, str(e))
+        finally:
+            self._reconciling.release()
+
+
+class SyslogReceiver(object):
+    """Receives router logs over UDP syslog and dispatches them to presence trackers by sender address.
+     Reconciliations run on an executor so that a slow router does not hold up receiving.
+    """
+
+    def __init__(self, trackers: Dict[str, PresenceTracker], *, host: str = '0.0.0.0', port: int = 514,
+                 workers: int = 4, executor: Optional[Executor] = None):
+        """
+            :param trackers: presence trackers by router address
+            :param workers: reconciliations run in parallel
+            :param executor: executor for reconciliations, a thread pool by default,
+            only the default one is shut down on `close`
+        """
+        self._trackers = trackers
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers)
+        self._owns_executor = executor is None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((host, port))
+        self._running = False
+
+    @property
+    def address(self):
+        return self._socket.getsockname()
+
+    def handle_datagram(self, data: bytes, address: str) -> Optional[PresenceEvent]:
+        tracker = self._trackers.get(address)
+        if tracker is None:
+            _LOGGER.debug('Ignoring log message from unknown router %s', address)
+            return None
+
+        line = _SYSLOG_PRIORITY_REGEX.sub('', data.decode('UTF-8', errors='replace')).strip()
+        return tracker.handle_line(line)
+
+    def serve_forever(self, poll_interval: float = 1.0):
+        """Handles incoming messages and runs due reconciliations until `stop` is called."""
+        self._running = True
+        self._socket.settimeout(poll_interval)
+        for tracker in self._trackers.values():
+            tracker.maybe_reconcile(self._executor)
+
+        while self._running:
+            try:
+                data, (address, _) = self._socket.recvfrom(65535)
+            except socket.timeout:
+                pass
+            except OSError:
+                if self._running:
+                    raise
+                break
+            else:
+                self.handle_datagram(data, address)
+
+            for tracker in self._trackers.values():
+                tracker.maybe_reconcile(self._executor)
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        self.stop()
+        self._socket.close()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
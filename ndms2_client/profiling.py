@@ -0,0 +1,117 @@
+"""Opt-in profiling of the response parsers.
+
+    with profiling.profile() as profiler:
+        client.get_interfaces()
+    print(profiler.report())
+
+Setting the `NDMS2_PROFILE` environment variable enables profiling for the whole
+process; the report is printed to stderr on exit, or written to the file named by
+the variable unless it is `1`. When profiling is off the parsers only check
+`profiling.active()` once per call.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+STAGE_FIX_CONTINUATION = 'fix_continuation_lines'
+STAGE_PARSE_DICT = 'parse_dict_lines'
+STAGE_PARSE_TABLE = 'parse_table_lines'
+STAGE_FROM_DICT = 'from_dict'
+
+_UNKNOWN_COMMAND = '-'
+
+
+class StageStats(NamedTuple):
+    calls: int
+    items: int
+    seconds: float
+
+
+class ParserProfile(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}  # type: Dict[Tuple[str, str], List]
+
+    def set_command(self, command: str):
+        """Attributes the following parsing in the current thread to the command."""
+        self._local.command = command
+
+    def record(self, stage: str, started: float, items: int = 1):
+        """Adds the time since `started` (a `time.perf_counter()` value) to the stage."""
+        self.add(stage, time.perf_counter() - started, items)
+
+    def add(self, stage: str, elapsed: float, items: int = 1):
+        key = (getattr(self._local, 'command', _UNKNOWN_COMMAND), stage)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = [0, 0, 0.0]
+            stats[0] += 1
+            stats[1] += items
+            stats[2] += elapsed
+
+    def stats(self) -> Dict[str, Dict[str, StageStats]]:
+        with self._lock:
+            result = {}  # type: Dict[str, Dict[str, StageStats]]
+            for (command, stage), (calls, items, seconds) in self._stats.items():
+                result.setdefault(command, {})[stage] = StageStats(calls, items, seconds)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def report(self) -> str:
+        lines = ['%-40s %-24s %8s %10s %12s' % ('command', 'stage', 'calls', 'items', 'total ms')]
+        for command, stages in sorted(self.stats().items()):
+            for stage, stats in sorted(stages.items(), key=lambda item: -item[1].seconds):
+                lines.append('%-40s %-24s %8d %10d %12.3f' % (
+                    command, stage, stats.calls, stats.items, stats.seconds * 1000))
+        return '\n'.join(lines) + '\n'
+
+
+_active = None  # type: Optional[ParserProfile]
+
+
+def active() -> Optional[ParserProfile]:
+    return _active
+
+
+@contextmanager
+def profile(profiler: Optional[ParserProfile] = None):
+    """Collects parser statistics within the context."""
+    global _active
+
+    previous = _active
+    _active = profiler or ParserProfile()
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def _enable_from_environment():
+    global _active
+
+    target = os.environ.get('NDMS2_PROFILE')
+    if not target:
+        return
+
+    profiler = _active = ParserProfile()
+
+    def dump():
+        if target.lower() in ('1', 'true', 'yes'):
+            sys.stderr.write(profiler.report())
+        else:
+            with open(target, 'w', encoding='UTF-8') as f:
+                f.write(profiler.report())
+
+    atexit.register(dump)
+
+
+_enable_from_environment()
@@ -0,0 +1,141 @@
+"""Capturing and replaying router responses.
+
+`RecordingConnection` wraps any connection and appends every command, its response
+and latency to a JSON lines file. `ReplayConnection` answers the same commands from
+such a file, so `Client` and the parsers can be exercised offline against real outputs.
+"""
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from . import exceptions
+from .connection import Connection
+from .exceptions import ConnectionException, ConnectionTimeoutException
+
+
+class RecordingConnection(Connection):
+    def __init__(self, connection: Connection, path: str):
+        self._connection = connection
+        self._file = open(path, 'a', encoding='UTF-8')
+
+    @property
+    def connected(self) -> bool:
+        return self._connection.connected
+
+    def connect(self, *, timeout: Optional[float] = None):
+        self._connection.connect(timeout=timeout)
+
+    def disconnect(self):
+        self._connection.disconnect()
+
+    def close(self):
+        self._file.close()
+
+    def run_command(self, command: str, *, timeout: Optional[float] = None) -> List[str]:
+        started = time.monotonic()
+        try:
+            if timeout is None:
+                response = self._connection.run_command(command)
+            else:
+                response = self._connection.run_command(command, timeout=timeout)
+        except Exception as e:
+            self._record(command, None, time.monotonic() - started, e)
+            raise
+
+        self._record(command, response, time.monotonic() - started)
+        return response
+
+    def run_commands(self, commands: List[str], *, timeout: Optional[float] = None) -> List[List[str]]:
+        started = time.monotonic()
+        try:
+            if timeout is None:
+                responses = self._connection.run_commands(commands)
+            else:
+                responses = self._connection.run_commands(commands, timeout=timeout)
+        except Exception as e:
+            # a failed batch has no responses at all, replaying it fails on the first command
+            if len(commands) > 0:
+                self._record(commands[0], None, time.monotonic() - started, e)
+            raise
+
+        # pipelined commands share the elapsed time
+        elapsed = (time.monotonic() - started) / max(1, len(commands))
+        for command, response in zip(commands, responses):
+            self._record(command, response, elapsed)
+
+        return responses
+
+    def _record(self, command: str, response: Optional[List[str]], elapsed: float,
+                error: Optional[Exception] = None):
+        record = {'command': command, 'response': response, 'elapsed': elapsed}
+        if error is not None:
+            record['error'] = str(error)
+            record['error_type'] = type(error).__name__
+
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+
+class ReplayConnection(Connection):
+    def __init__(self, path: str, *, with_latency=False, loop=False):
+        """
+            :param path: file written by `RecordingConnection`
+            :param with_latency: sleep for the recorded latency before returning a response
+            :param loop: start over with the first recorded response once all responses
+            for a command are used up
+        """
+        self._with_latency = with_latency
+        self._loop = loop
+        self._connected = False
+        self._recorded = {}  # type: Dict[str, List[dict]]
+        self._pending = {}  # type: Dict[str, Deque[dict]]
+
+        with open(path, 'r', encoding='UTF-8') as f:
+            for line in f:
+                if len(line.strip()) == 0:
+                    continue
+                record = json.loads(line)
+                self._recorded.setdefault(record['command'], []).append(record)
+
+        for command, records in self._recorded.items():
+            self._pending[command] = deque(records)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def connect(self, *, timeout: Optional[float] = None):
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def run_command(self, command: str, *, timeout: Optional[float] = None) -> List[str]:
+        if not self._connected:
+            self.connect()
+
+        pending = self._pending.get(command)
+        if pending is None:
+            raise ConnectionException('No recorded response for command: %s' % command)
+
+        if len(pending) == 0:
+            if not self._loop:
+                raise ConnectionException('Recorded responses exhausted for command: %s' % command)
+            pending.extend(self._recorded[command])
+
+        record = pending.popleft()
+
+        if self._with_latency:
+            if timeout is not None and record['elapsed'] > timeout:
+                time.sleep(timeout)
+                raise ConnectionTimeoutException('No expected response from server')
+            time.sleep(record['elapsed'])
+
+        if 'error' in record:
+            error_type = getattr(exceptions, record.get('error_type', ''), None)
+            if not isinstance(error_type, type) or not issubclass(error_type, ConnectionException):
+                error_type = ConnectionException
+            raise error_type(record['error'])
+
+        return list(record['response'])
@@ -0,0 +1,65 @@
+import logging
+import random
+import time
+from typing import Callable, Optional, Tuple, Type, TypeVar
+
+from .exceptions import AuthenticationException, ConnectionException, RouterBusyException
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class RetryPolicy(object):
+    """Retries idempotent operations on transient failures with jittered exponential backoff.
+     A failed Telnet command drops the session, so a retry after a connection error
+     runs on a freshly connected one.
+    """
+
+    def __init__(self, attempts: int = 3, *,
+                 backoff: float = 0.5,
+                 max_backoff: float = 5.0,
+                 jitter: float = 0.5,
+                 retry_on: Tuple[Type[Exception], ...] = (ConnectionException, RouterBusyException),
+                 never_retry_on: Tuple[Type[Exception], ...] = (AuthenticationException,),
+                 sleep: Callable[[float], None] = time.sleep):
+        assert attempts >= 1, 'At least one attempt is required'
+        assert 0 <= jitter <= 1, 'Jitter should be between 0 and 1'
+
+        self._attempts = attempts
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._jitter = jitter
+        self._retry_on = retry_on
+        self._never_retry_on = never_retry_on
+        self._sleep = sleep
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, self._retry_on) and not isinstance(error, self._never_retry_on)
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self._max_backoff, self._backoff * (2 ** attempt))
+        return delay * (1 - self._jitter * random.random())
+
+    def call(self, func: Callable[[], T], *, deadline: Optional[float] = None) -> T:
+        """
+            Calls the function until it succeeds or attempts are exhausted
+            :param func: idempotent operation to run
+            :param deadline: `time.monotonic()` value no retry is scheduled past
+            :return: the function result
+        """
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                if attempt + 1 >= self._attempts or not self.is_retryable(e):
+                    raise
+
+                delay = self.delay(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+
+                _LOGGER.warning('Attempt %d failed: %s, retrying in %.2fs', attempt + 1, str(e), delay)
+                self._sleep(delay)
+                attempt += 1
@@ -0,0 +1,175 @@
+"""Polling of many routers with per query intervals.
+
+Each router has its own set of queries. Due times are jittered to spread the load
+across the fleet, queries of a router falling due close together are run within one
+visit, and a router is not visited again while its previous visit is running.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .client import Client
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Query(NamedTuple):
+    name: str
+    interval: float
+    run: Callable[[Client], Any]
+
+
+DEVICES = Query('devices', 10, lambda client: client.get_devices())
+INTERFACES = Query('interfaces', 60, lambda client: client.get_interfaces())
+VERSION = Query('version', 3600, lambda client: client.get_router_info())
+
+
+class QueryResult(NamedTuple):
+    router: str
+    query: str
+    result: Any
+    error: Optional[Exception]
+    started: float
+    elapsed: float
+
+
+class _Router(object):
+    def __init__(self, name: str, client: Client, queries: List[Query]):
+        self.name = name
+        self.client = client
+        self.queries = queries
+        self.next_due = {}  # type: Dict[str, float]
+        self.in_flight = False
+        self.deferred = False
+        self.skipped = 0
+
+
+class PollingScheduler(object):
+    def __init__(self, on_result: Callable[[QueryResult], None], *,
+                 jitter: float = 0.1,
+                 coalesce_window: float = 1.0,
+                 workers: int = 8,
+                 executor: Optional[Executor] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+            :param on_result: called with the result of every query run, from worker threads
+            :param jitter: max relative deviation of query intervals
+            :param coalesce_window: queries due within this many seconds run in the same visit
+            :param workers: routers visited in parallel
+            :param executor: executor for router visits, a thread pool by default,
+            only the default one is shut down on `stop`
+        """
+        assert 0 <= jitter < 1, 'Jitter should be between 0 and 1'
+
+        self._on_result = on_result
+        self._jitter = jitter
+        self._coalesce_window = coalesce_window
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers)
+        self._owns_executor = executor is None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._routers = {}  # type: Dict[str, _Router]
+        self._stopped = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def add_router(self, name: str, client: Client, queries: List[Query]):
+        router = _Router(name, client, queries)
+        now = self._clock()
+        for query in queries:
+            # first runs are spread with the jitter so that routers are not polled all at once
+            router.next_due[query.name] = now + random.random() * query.interval * self._jitter
+
+        with self._lock:
+            self._routers[name] = router
+
+    def remove_router(self, name: str):
+        with self._lock:
+            self._routers.pop(name, None)
+
+    def skipped(self, name: str) -> int:
+        """Number of visits deferred because the previous visit of the router was still running."""
+        return self._routers[name].skipped
+
+    def run_pending(self) -> int:
+        """Starts visits of the routers having due queries, returns the number of visits started."""
+        now = self._clock()
+        visits = []
+        with self._lock:
+            for router in self._routers.values():
+                due = [query for query in router.queries
+                       if router.next_due[query.name] <= now + self._coalesce_window]
+                if len(due) == 0 or all(router.next_due[query.name] > now for query in due):
+                    continue
+
+                if router.in_flight:
+                    # due queries stay due and join the next visit
+                    if not router.deferred:
+                        router.deferred = True
+                        router.skipped += 1
+                        _LOGGER.debug('Deferring %s, previous visit is still running', router.name)
+                    continue
+
+                for query in due:
+                    router.next_due[query.name] = self._next_due(router.next_due[query.name], query.interval, now)
+
+                router.in_flight = True
+                router.deferred = False
+                visits.append((router, due))
+
+        for router, due in visits:
+            self._executor.submit(self._visit, router, due)
+
+        return len(visits)
+
+    def start(self, tick: float = 0.5):
+        """Runs the scheduler in a background thread."""
+        assert self._thread is None, 'Scheduler is already running'
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(tick,), name='ndms2-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def _run(self, tick: float):
+        while not self._stopped.wait(tick):
+            try:
+                self.run_pending()
+            except Exception as e:
+                _LOGGER.error('Scheduler tick failed: %s', str(e))
+
+    def _next_due(self, due: float, interval: float, now: float) -> float:
+        interval *= 1 + self._jitter * (2 * random.random() - 1)
+        due += interval
+        # do not try to catch up with missed runs
+        return due if due > now else now + interval
+
+    def _visit(self, router: _Router, queries: List[Query]):
+        try:
+            for query in queries:
+                started = self._clock()
+                result = None
+                error = None
+                try:
+                    result = query.run(router.client)
+                except Exception as e:
+                    _LOGGER.error('Query %s on %s failed: %s', query.name, router.name, str(e))
+                    error = e
+
+                try:
+                    self._on_result(QueryResult(router.name, query.name, result, error, started,
+                                                self._clock() - started))
+                except Exception as e:
+                    _LOGGER.error('Result handler failed: %s', str(e))
+        finally:
+            with self._lock:
+                router.in_flight = False
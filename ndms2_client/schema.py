@@ -0,0 +1,111 @@
+"""Declarative mapping of `show` command responses to typed records.
+
+    class Station(NamedTuple):
+        mac: str
+        ap: str
+        rssi: Optional[int]
+
+    ASSOCIATIONS = CommandSchema('show associations', Station, items='station')
+    stations = client.query(ASSOCIATIONS)
+
+Record fields are looked up by the field name with underscores replaced by dashes
+unless mapped explicitly, and converted according to the field annotation. The
+per-field lookups and conversions are prepared once when the schema is declared.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type, Union, get_type_hints
+
+from .client import _parse_collection_lines, _parse_dict_lines
+
+
+class Field(NamedTuple):
+    key: str  # nested keys are separated with '/'
+    converter: Optional[Callable[[Any], Any]] = None
+    default: Any = None
+
+
+class CommandSchema(object):
+    def __init__(self, command: str, record_type: Type[tuple],
+                 fields: Optional[Dict[str, Union[str, Field]]] = None, *,
+                 items: Optional[str] = None, collection=False):
+        """
+            :param command: command to run, may contain `{}` placeholders for query arguments
+            :param record_type: NamedTuple class of the records
+            :param fields: mapping of record field names to response keys or `Field` declarations
+            :param items: key of the repeated entries in the response, like `station` or `host`
+            :param collection: response is a collection of named entries, like `show interface`
+        """
+        assert items is None or not collection, 'Response is either a collection or has items'
+
+        self.command = command
+        self.record_type = record_type
+        self._items = items
+        self._collection = collection
+        self._getters = _compile_getters(record_type, fields or {})
+
+    def parse(self, lines: List[str]) -> List[tuple]:
+        if self._collection:
+            entries = _parse_collection_lines(lines)
+        else:
+            info = _parse_dict_lines(lines)
+            if self._items is None:
+                entries = [info] if len(info) > 0 else []
+            else:
+                entries = info.get(self._items, [])
+                if not isinstance(entries, list):
+                    entries = [entries]
+
+        return [self.convert(entry) for entry in entries if isinstance(entry, dict)]
+
+    def convert(self, info: Dict[str, Any]) -> tuple:
+        return self.record_type._make([getter(info) for getter in self._getters])
+
+
+def _compile_getters(record_type: Type[tuple], fields: Dict[str, Union[str, Field]]) -> Tuple[Callable, ...]:
+    unknown = set(fields.keys()) - set(record_type._fields)
+    assert len(unknown) == 0, 'Unknown record fields: ' + ', '.join(sorted(unknown))
+
+    hints = get_type_hints(record_type)
+
+    getters = []
+    for name in record_type._fields:
+        spec = fields.get(name, name.replace('_', '-'))
+        if isinstance(spec, str):
+            spec = Field(spec)
+
+        converter = spec.converter or _converter_for(hints.get(name))
+        getters.append(_getter(spec.key.split('/'), converter, spec.default))
+
+    return tuple(getters)
+
+
+def _converter_for(hint: Any) -> Callable[[Any], Any]:
+    args = getattr(hint, '__args__', None) or (hint,)
+    if bool in args:
+        return _to_bool
+    for converter in (int, float, str):
+        if converter in args:
+            return converter
+
+    return lambda value: value
+
+
+def _to_bool(value: Any) -> bool:
+    # the CLI prints flags as yes/no, sometimes as 1/0
+    return str(value).strip().lower() in ('yes', '1', 'true', 'on', 'up')
+
+
+def _getter(path: List[str], converter: Callable[[Any], Any], default: Any) -> Callable[[Dict[str, Any]], Any]:
+    if len(path) == 1:
+        key = path[0]
+
+        def get(info: Dict[str, Any]) -> Any:
+            value = info.get(key)
+            return default if value is None else converter(value)
+    else:
+        def get(info: Dict[str, Any]) -> Any:
+            value = info
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            return default if value is None else converter(value)
+
+    return get
@@ -0,0 +1,291 @@
+"""Compact binary storage for polled snapshots.
+
+A snapshot file starts with a magic header followed by appended frames. Each frame
+holds one snapshot: either a list of records (`Device`, `InterfaceInfo`, `RouterInfo`)
+stored column by column with per-column dictionary encoding, or a raw parsed tree.
+A partially written trailing frame is ignored on reading.
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .client import Device, InterfaceInfo, RouterInfo
+
+_MAGIC = b'NDS1'
+_FRAME_HEADER = struct.Struct('<IBd')  # payload length, kind, timestamp
+_FLOAT = struct.Struct('<d')
+
+_KIND_TREE = 0
+_RECORD_TYPES = (Device, InterfaceInfo, RouterInfo)  # kind is the index + 1
+
+_TAG_NONE = 0
+_TAG_STR = 1
+_TAG_INT = 2
+_TAG_FLOAT = 3
+_TAG_LIST = 4
+_TAG_DICT = 5
+_TAG_TRUE = 6
+_TAG_FALSE = 7
+
+
+class Snapshot(NamedTuple):
+    timestamp: float
+    data: Any
+
+
+class SnapshotWriter(object):
+    """Appends snapshots to a file, creating it if needed."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'ab')  # type: BinaryIO
+        if self._file.tell() == 0:
+            self._file.write(_MAGIC)
+
+    def append(self, data: Any, timestamp: Optional[float] = None):
+        """
+            Appends a snapshot
+            :param data: list of records of the same type or a parsed tree
+            :param timestamp: snapshot time, current time by default
+        """
+        self._file.write(encode_frame(data, time.time() if timestamp is None else timestamp))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class SnapshotReader(object):
+    """Reads snapshots from a memory mapped file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = None  # type: Optional[mmap.mmap]
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._map[:len(_MAGIC)] != _MAGIC:
+                self.close()
+                raise ValueError('Not a snapshot file: %s' % path)
+
+    def __iter__(self) -> Iterator[Snapshot]:
+        if self._map is None:
+            return
+
+        offset = len(_MAGIC)
+        size = len(self._map)
+        while offset + _FRAME_HEADER.size <= size:
+            length, kind, timestamp = _FRAME_HEADER.unpack_from(self._map, offset)
+            offset += _FRAME_HEADER.size
+            if offset + length > size:
+                break
+
+            yield Snapshot(timestamp=timestamp, data=_decode_payload(kind, self._map, offset))
+            offset += length
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def encode_frame(data: Any, timestamp: float) -> bytes:
+    kind = _record_kind(data)
+    payload = bytearray()
+    if kind == _KIND_TREE:
+        _encode_value(payload, data)
+    else:
+        _encode_records(payload, data)
+
+    return _FRAME_HEADER.pack(len(payload), kind, timestamp) + payload
+
+
+def _record_kind(data: Any) -> int:
+    if isinstance(data, list) and len(data) > 0:
+        record_type = type(data[0])
+        if record_type in _RECORD_TYPES and all(type(item) is record_type for item in data):
+            return _RECORD_TYPES.index(record_type) + 1
+
+    return _KIND_TREE
+
+
+def _encode_records(buf: bytearray, records: List[tuple]):
+    fields = type(records[0])._fields
+
+    _encode_varint(buf, len(fields))
+    for field in fields:
+        _encode_str(buf, field)
+
+    _encode_varint(buf, len(records))
+    for column in zip(*records):
+        index = {}  # type: Dict[Any, int]
+        values = []
+        for value in column:
+            key = (type(value), value)
+            if key not in index:
+                index[key] = len(index)
+                values.append(value)
+
+        _encode_varint(buf, len(values))
+        for value in values:
+            _encode_value(buf, value)
+        for value in column:
+            _encode_varint(buf, index[(type(value), value)])
+
+
+def _decode_payload(kind: int, data: mmap.mmap, offset: int) -> Any:
+    if kind == _KIND_TREE:
+        value, _ = _decode_value(data, offset)
+        return value
+
+    if kind > len(_RECORD_TYPES):
+        raise ValueError('Unknown snapshot kind: %d' % kind)
+
+    record_type = _RECORD_TYPES[kind - 1]
+
+    field_count, offset = _decode_varint(data, offset)
+    fields = []
+    for _ in range(field_count):
+        field, offset = _decode_str(data, offset)
+        fields.append(field)
+
+    row_count, offset = _decode_varint(data, offset)
+    columns = []
+    for _ in range(field_count):
+        value_count, offset = _decode_varint(data, offset)
+        values = []
+        for _ in range(value_count):
+            value, offset = _decode_value(data, offset)
+            values.append(value)
+
+        column = []
+        for _ in range(row_count):
+            i, offset = _decode_varint(data, offset)
+            column.append(values[i])
+        columns.append(column)
+
+    if tuple(fields) == record_type._fields:
+        return [record_type._make(row) for row in zip(*columns)]
+
+    # file written with a different set of record fields
+    defaults = dict.fromkeys(record_type._fields)
+    known = [(field, columns[i]) for i, field in enumerate(fields) if field in defaults]
+    records = []
+    for row in range(row_count):
+        values = dict(defaults)
+        for field, column in known:
+            values[field] = column[row]
+        records.append(record_type(**values))
+
+    return records
+
+
+def _encode_value(buf: bytearray, value: Any):
+    if value is None:
+        buf.append(_TAG_NONE)
+    elif value is True:
+        buf.append(_TAG_TRUE)
+    elif value is False:
+        buf.append(_TAG_FALSE)
+    elif isinstance(value, str):
+        buf.append(_TAG_STR)
+        _encode_str(buf, value)
+    elif isinstance(value, int):
+        buf.append(_TAG_INT)
+        _encode_varint(buf, (value << 1) if value >= 0 else ((-value << 1) - 1))
+    elif isinstance(value, float):
+        buf.append(_TAG_FLOAT)
+        buf += _FLOAT.pack(value)
+    elif isinstance(value, (list, tuple)):
+        buf.append(_TAG_LIST)
+        _encode_varint(buf, len(value))
+        for item in value:
+            _encode_value(buf, item)
+    elif isinstance(value, dict):
+        buf.append(_TAG_DICT)
+        _encode_varint(buf, len(value))
+        for key, item in value.items():
+            _encode_str(buf, str(key))
+            _encode_value(buf, item)
+    else:
+        raise TypeError('Unsupported snapshot value type: %s' % type(value).__name__)
+
+
+def _decode_value(data, offset: int) -> Tuple[Any, int]:
+    tag = data[offset]
+    offset += 1
+
+    if tag == _TAG_NONE:
+        return None, offset
+    if tag == _TAG_TRUE:
+        return True, offset
+    if tag == _TAG_FALSE:
+        return False, offset
+    if tag == _TAG_STR:
+        return _decode_str(data, offset)
+    if tag == _TAG_INT:
+        value, offset = _decode_varint(data, offset)
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+    if tag == _TAG_FLOAT:
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+    if tag == _TAG_LIST:
+        count, offset = _decode_varint(data, offset)
+        items = []
+        for _ in range(count):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _TAG_DICT:
+        count, offset = _decode_varint(data, offset)
+        result = {}
+        for _ in range(count):
+            key, offset = _decode_str(data, offset)
+            result[key], offset = _decode_value(data, offset)
+        return result, offset
+
+    raise ValueError('Unknown snapshot value tag: %d' % tag)
+
+
+def _encode_str(buf: bytearray, value: str):
+    encoded = value.encode('UTF-8')
+    _encode_varint(buf, len(encoded))
+    buf += encoded
+
+
+def _decode_str(data, offset: int) -> Tuple[str, int]:
+    length, offset = _decode_varint(data, offset)
+    return data[offset:offset + length].decode('UTF-8'), offset + length
+
+
+def _encode_varint(buf: bytearray, value: int):
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _decode_varint(data, offset: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
@@ -0,0 +1,99 @@
+"""Tracing of raw router responses.
+
+Responses are formatted only when they are going to be emitted: either the module
+logger has DEBUG enabled or a capture file is configured. Traced responses can be
+sampled and are capped in size. The capture file receives one JSON object per
+response and is rotated by size.
+"""
+import json
+import logging
+import random
+from typing import List, Optional, Tuple
+
+_CAPTURE_LOGGER = logging.getLogger(__name__ + '.capture')
+_CAPTURE_LOGGER.propagate = False
+
+_sample_rate = 1.0
+_max_size = 4096
+_capture_handler = None  # type: Optional[logging.Handler]
+
+
+def configure(*, sample_rate: Optional[float] = None, max_size: Optional[int] = None):
+    """
+        Configures response tracing
+        :param sample_rate: share of responses traced, from 0 to 1
+        :param max_size: max number of characters of a response traced
+    """
+    global _sample_rate, _max_size
+
+    if sample_rate is not None:
+        assert 0 <= sample_rate <= 1, 'Sample rate should be between 0 and 1'
+        _sample_rate = sample_rate
+    if max_size is not None:
+        _max_size = max_size
+
+
+def enable_capture(path: str, *, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    """Writes traced responses to a size rotated file of JSON lines, independently of the logging setup."""
+    global _capture_handler
+
+    # imported here as it pulls socket and pickle into every package import otherwise
+    import logging.handlers
+
+    disable_capture()
+
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                   encoding='UTF-8')
+    handler.setFormatter(_CaptureFormatter())
+    _CAPTURE_LOGGER.addHandler(handler)
+    _CAPTURE_LOGGER.setLevel(logging.DEBUG)
+    _capture_handler = handler
+
+
+def disable_capture():
+    global _capture_handler
+
+    if _capture_handler is not None:
+        _CAPTURE_LOGGER.removeHandler(_capture_handler)
+        _capture_handler.close()
+        _capture_handler = None
+
+
+def trace_response(logger: logging.Logger, command: str, lines: List[str]):
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if not debug and _capture_handler is None:
+        return
+    if _sample_rate < 1 and random.random() >= _sample_rate:
+        return
+
+    text, truncated = _capped_text(lines, _max_size)
+
+    if debug:
+        logger.debug('Command %s (%d lines%s): %s', command, len(lines), ', truncated' if truncated else '', text)
+    if _capture_handler is not None:
+        _CAPTURE_LOGGER.debug(text, extra={
+            'ndms2_command': command,
+            'ndms2_lines': len(lines),
+            'ndms2_truncated': truncated,
+        })
+
+
+def _capped_text(lines: List[str], max_size: int) -> Tuple[str, bool]:
+    size = 0
+    for i, line in enumerate(lines):
+        size += len(line) + 1
+        if size > max_size:
+            return '\n'.join(lines[:i + 1])[:max_size], True
+
+    return '\n'.join(lines), False
+
+
+class _CaptureFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            'time': record.created,
+            'command': getattr(record, 'ndms2_command', None),
+            'lines': getattr(record, 'ndms2_lines', None),
+            'truncated': getattr(record, 'ndms2_truncated', None),
+            'response': record.getMessage(),
+        })
@@ -0,0 +1,111 @@
+"""Watching interface state changes.
+
+Only the volatile interface fields are fetched and compared. A restart of an
+interface between two polls is detected by its uptime growing less than the time
+passed, even if the state looks the same on both polls.
+"""
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .client import Client
+from .schema import CommandSchema
+
+EVENT_ADDED = 'added'
+EVENT_REMOVED = 'removed'
+EVENT_CHANGED = 'changed'
+EVENT_FLAPPED = 'flapped'
+
+
+class InterfaceState(NamedTuple):
+    name: str
+    link: Optional[str]
+    connected: Optional[str]
+    state: Optional[str]
+    uptime: Optional[int]
+    id: Optional[str] = None
+
+
+class InterfaceEvent(NamedTuple):
+    name: str
+    kind: str
+    old: Optional[InterfaceState]
+    new: Optional[InterfaceState]
+
+
+# the name falls back to the id like `InterfaceInfo.name` does
+_INTERFACES_STATE = CommandSchema('show interface', InterfaceState, {'name': 'interface-name'}, collection=True)
+_INTERFACE_STATE = CommandSchema('show interface {}', InterfaceState, {'name': 'interface-name'})
+
+
+class InterfaceWatcher(object):
+    def __init__(self, client: Client, interfaces: Optional[List[str]] = None, *,
+                 single_query_limit: int = 2,
+                 uptime_tolerance: float = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+            :param client: router client
+            :param interfaces: ids or names of the interfaces to watch, all interfaces by default
+            :param single_query_limit: up to this many interfaces are queried one by one,
+            otherwise the whole interface list is fetched
+            :param uptime_tolerance: seconds the uptime may fall behind the time passed without a flap reported
+        """
+        self._client = client
+        self._interfaces = set(interfaces) if interfaces is not None else None
+        self._single_query_limit = single_query_limit
+        self._uptime_tolerance = uptime_tolerance
+        self._clock = clock
+        self._states = None  # type: Optional[Dict[str, InterfaceState]]
+        self._last_poll = None  # type: Optional[float]
+
+    @property
+    def states(self) -> Dict[str, InterfaceState]:
+        return dict(self._states or {})
+
+    def poll(self) -> List[InterfaceEvent]:
+        """Fetches the interface states, returning changes since the previous poll.
+         The first poll only sets the baseline.
+        """
+        now = self._clock()
+        states = {state.name: state for state in self._fetch()}
+
+        previous = self._states
+        elapsed = now - self._last_poll if self._last_poll is not None else 0
+        self._states = states
+        self._last_poll = now
+
+        if previous is None:
+            return []
+
+        events = []
+        for name, state in states.items():
+            old = previous.get(name)
+            if old is None:
+                events.append(InterfaceEvent(name, EVENT_ADDED, None, state))
+            elif (old.link, old.connected, old.state) != (state.link, state.connected, state.state):
+                events.append(InterfaceEvent(name, EVENT_CHANGED, old, state))
+            elif self._restarted(old, state, elapsed):
+                events.append(InterfaceEvent(name, EVENT_FLAPPED, old, state))
+
+        for name, old in previous.items():
+            if name not in states:
+                events.append(InterfaceEvent(name, EVENT_REMOVED, old, None))
+
+        return events
+
+    def _restarted(self, old: InterfaceState, new: InterfaceState, elapsed: float) -> bool:
+        if old.uptime is None or new.uptime is None:
+            return False
+        return new.uptime < old.uptime + elapsed - self._uptime_tolerance
+
+    def _fetch(self) -> List[InterfaceState]:
+        if self._interfaces is not None and len(self._interfaces) <= self._single_query_limit:
+            states = []
+            for name in sorted(self._interfaces):
+                states += self._client.query(_INTERFACE_STATE, name)
+        else:
+            states = self._client.query(_INTERFACES_STATE)
+
+        states = [state if state.name is not None else state._replace(name=state.id) for state in states]
+        return [state for state in states
+                if state.name is not None and (self._interfaces is None or state.name in self._interfaces
+                                               or state.id in self._interfaces)]
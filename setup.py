@@ -12,7 +12,12 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/foxel/python_ndms2_client",
-    packages=setuptools.find_packages(exclude=['tests']),
+    packages=setuptools.find_packages(exclude=['tests', 'benchmarks']),
+    entry_points={
+        'console_scripts': [
+            'ndms2=ndms2_client.cli:main',
+        ],
+    },
     classifiers=(
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3.6",
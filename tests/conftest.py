@@ -0,0 +1,36 @@
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Union
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ndms2_client import Connection
+
+
+class StubConnection(Connection):
+    """Answers commands from a mapping or a callable, which may raise, and records the commands and timeouts."""
+
+    def __init__(self, responses: Union[Dict[str, List[str]], Callable[[str], List[str]], None] = None,
+                 default: Optional[List[str]] = None):
+        self.commands = []  # type: List[str]
+        self.timeouts = []  # type: List[Optional[float]]
+        self.connect_timeout = None  # type: Optional[float]
+        self._responses = responses if responses is not None else {}
+        self._default = default if default is not None else []
+
+    @property
+    def connected(self):
+        return True
+
+    def connect(self, *, timeout: Optional[float] = None):
+        self.connect_timeout = timeout
+
+    def disconnect(self):
+        pass
+
+    def run_command(self, command: str, *, timeout: Optional[float] = None) -> List[str]:
+        self.commands.append(command)
+        self.timeouts.append(timeout)
+        if callable(self._responses):
+            return self._responses(command)
+        return self._responses.get(command, self._default)
@@ -16,11 +16,24 @@ def test_check_command_result_positive(positive_results: List[str]) -> None:
 
 def test_check_command_result_error(error_results: List[str]) -> None:
     from ndms2_client.client import _check_command_result
+    from ndms2_client.exceptions import CommandException
 
-    with pytest.raises(Exception):
+    with pytest.raises(CommandException):
         _check_command_result(error_results)
 
 
+def test_check_command_result_classification(classified_results: Tuple[List[str], str]) -> None:
+    from ndms2_client.client import _check_command_result
+    import ndms2_client.exceptions as exceptions
+
+    lines, exception_name = classified_results
+
+    with pytest.raises(getattr(exceptions, exception_name)) as e:
+        _check_command_result(lines)
+
+    assert type(e.value).__name__ == exception_name
+
+
 @pytest.fixture(params=range(2))
 def positive_results(request) -> List[str]:
     data = [
@@ -38,3 +51,13 @@ def error_results(request) -> List[str]:
         ['Network::Interface::Base error[6553609]: unable to find GuestWiF as "Network::Interface::Base".']
     ]
     return data[request.param]
+
+
+@pytest.fixture(params=range(3))
+def classified_results(request) -> Tuple[List[str], str]:
+    data = [
+        (['Command::Base error[7405600]: no such command: shw.'], 'UnknownCommandException'),
+        (['Core::Configurator error[1179700]: configuration is locked, try again later.'], 'RouterBusyException'),
+        (['Command::Base error[7405602]: argument parse error.'], 'CommandException'),
+    ]
+    return data[request.param]
@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import ConnectionTimeoutException
+
+
+def inventory_connection(router: dict) -> StubConnection:
+    def respond(_):
+        if router['host'] == 'unreachable':
+            raise ConnectionTimeoutException('Deadline exceeded')
+        return ['    model: {}'.format(router['name'])]
+
+    return StubConnection(respond)
+
+
+def test_load_inventory(tmpdir):
+    from ndms2_client.cli import load_inventory
+
+    path = tmpdir.join('inventory.json')
+    path.write(json.dumps({
+        'defaults': {'username': 'monitor'},
+        'routers': [{'host': '192.168.1.1'}, {'name': 'office', 'host': '10.0.0.1', 'port': 2323}],
+    }))
+
+    routers = load_inventory(str(path))
+
+    assert routers == [
+        {'name': '192.168.1.1', 'host': '192.168.1.1', 'port': 23, 'username': 'monitor', 'password': ''},
+        {'name': 'office', 'host': '10.0.0.1', 'port': 2323, 'username': 'monitor', 'password': ''},
+    ]
+
+
+def test_run_inventory():
+    from ndms2_client.cli import run_inventory
+
+    routers = [{'name': 'office', 'host': '192.168.1.1'}, {'name': 'home', 'host': 'unreachable'}]
+
+    results = list(run_inventory(routers, 'version', connection_factory=lambda router, _: inventory_connection(router)))
+    results = {result['router']: result for result in results}
+
+    assert results['office']['ok']
+    assert results['office']['result']['model'] == 'office'
+    assert not results['home']['ok']
+    assert results['home']['error'].startswith('ConnectionTimeoutException')
+    assert all('elapsed' in result for result in results.values())
+
+
+def test_bad_inventory_entry():
+    from ndms2_client.cli import run_inventory
+
+    routers = [{'name': 'office', 'host': '192.168.1.1', 'port': '23', 'username': 'admin', 'password': 'secret'},
+               {'name': 'home', 'host': '192.168.2.1', 'port': 'telnet', 'username': 'admin', 'password': 'secret'}]
+
+    def connection_factory(router, timeout):
+        int(router['port'])
+        return inventory_connection(router)
+
+    results = {result['router']: result for result in run_inventory(routers, 'version',
+                                                                     connection_factory=connection_factory)}
+
+    assert results['office']['ok']
+    assert results['home']['error'].startswith('ValueError')
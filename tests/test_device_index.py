@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ndms2_client import Device
+
+
+def test_merge_sources():
+    from ndms2_client.device_index import DeviceIndex
+
+    index = DeviceIndex()
+    index.update('office', [Device('60:ff:ff:ff:ff:ff', None, None, 'Bridge0')], 'associations', timestamp=10)
+    index.update('office', [Device('60-FF-FF-FF-FF-FF', 'phone', '192.168.1.33', 'Bridge0')], 'arp', timestamp=11)
+
+    location = index.locate('60:ff:ff:ff:ff:ff')
+
+    assert len(index) == 1
+    assert location.router == 'office'
+    assert location.name == 'phone'
+    assert location.ip == '192.168.1.33'
+    assert location.sources == {'associations', 'arp'}
+    assert location.last_seen == 11
+
+
+def test_roaming_and_removal():
+    from ndms2_client.device_index import DeviceIndex
+
+    index = DeviceIndex()
+    index.update('office', [Device('60:FF:FF:FF:FF:FF', 'phone', '192.168.1.33', 'Bridge0')], 'hotspot', timestamp=10)
+    index.update('extender', [Device('60:FF:FF:FF:FF:FF', None, None, 'Bridge0')], 'associations', timestamp=20)
+
+    location = index.locate('60:ff:ff:ff:ff:ff')
+    assert location.router == 'extender'
+    assert location.name == 'phone'
+
+    index.update('extender', [], 'associations', timestamp=30)
+    assert index.locate('60:ff:ff:ff:ff:ff').router == 'office'
+
+    index.expire(5, now=30)
+    assert '60:ff:ff:ff:ff:ff' not in index
+    assert index.devices() == []
+
+
+def test_poll_clears_fallback_sources():
+    from ndms2_client.device_index import DeviceIndex
+
+    class FakeClient(object):
+        hotspot = []  # type: list
+
+        def get_hotspot_devices(self):
+            return self.hotspot
+
+        def get_arp_devices(self):
+            return [Device('60:FF:FF:FF:FF:FF', 'phone', '192.168.1.33', 'Bridge0')]
+
+        def get_associated_devices(self):
+            return [Device('60:FF:FF:FF:FF:FF', None, None, 'Bridge0')]
+
+    client = FakeClient()
+    index = DeviceIndex()
+    index.poll('office', client, timestamp=10)
+    assert index.locate('60:ff:ff:ff:ff:ff').sources == {'arp', 'associations'}
+
+    client.hotspot = [Device('70:FF:FF:FF:FF:FF', 'laptop', '192.168.1.34', 'Bridge0')]
+    index.poll('office', client, timestamp=20)
+
+    assert '60:ff:ff:ff:ff:ff' not in index
+    assert index.locate('70:ff:ff:ff:ff:ff').sources == {'hotspot'}
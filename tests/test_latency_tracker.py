@@ -0,0 +1,56 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client, LatencyTracker, ConnectionTimeoutException
+
+
+def test_default_timeout_until_enough_samples():
+    tracker = LatencyTracker(min_samples=3, multiplier=4, min_timeout=0.1)
+
+    tracker.record('show version', 0.1)
+    tracker.record('show version', 0.2)
+    assert tracker.timeout('show version', 30) == 30
+
+    tracker.record('show version', 0.3)
+    assert tracker.timeout('show version', 30) == pytest.approx(1.2)
+    assert tracker.timeout('show version', 1) == 1
+    assert tracker.timeout('show interface', 30) == 30
+
+
+def test_min_timeout():
+    tracker = LatencyTracker(min_samples=1, min_timeout=2)
+
+    tracker.record('show version', 0.01)
+    assert tracker.timeout('show version', 30) == 2
+
+
+def test_client_deadline(monkeypatch):
+    import time
+    import types
+    from ndms2_client import client as client_module
+
+    now = [0.0]
+    monkeypatch.setattr(client_module, 'time', types.SimpleNamespace(monotonic=lambda: now[0],
+                                                                     perf_counter=time.perf_counter))
+
+    def respond(_):
+        now[0] += 0.05
+        return []
+
+    connection = StubConnection(respond)
+    client = Client(connection)
+
+    client.get_arp_devices()
+    assert connection.timeouts == [None]
+
+    with pytest.raises(ConnectionTimeoutException):
+        with client.deadline(0.08):
+            client.get_arp_devices()
+            client.get_arp_devices()
+            client.get_arp_devices()
+
+    assert connection.timeouts == [None, pytest.approx(0.08), pytest.approx(0.03)]
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_telnetlib_is_not_imported_eagerly():
+    code = ("import sys, ndms2_client; "
+            "assert not {\"telnetlib\", \"socket\", \"hashlib\", \"logging.handlers\"} & set(sys.modules)")
+
+    subprocess.run([sys.executable, '-W', 'error::DeprecationWarning', '-c', code], cwd=_ROOT, check=True)
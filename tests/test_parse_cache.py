@@ -0,0 +1,91 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client, ParseCache
+
+
+def version_lines(release: str = '2.15.A.4.0-0'):
+    return [
+        '    release: {}'.format(release),
+        '      model: Keenetic Giga',
+        '        ndm: ',
+        '              exact: 0-1a2b3c4',
+    ]
+
+
+def test_cache_hits_and_misses():
+    from ndms2_client.client import _parse_dict_lines
+
+    connection = StubConnection(default=version_lines())
+    cache = ParseCache()
+    client = Client(connection, parse_cache=cache)
+
+    first = client.get_router_info()
+    second = client.get_router_info()
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    connection = StubConnection(default=version_lines('2.16.D.0.0-1'))
+    client = Client(connection, parse_cache=cache)
+    assert client.get_router_info().fw_version == '2.16.D.0.0-1'
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    tree = cache.get_or_parse(_parse_dict_lines, connection.run_command('show version'))
+    assert tree is cache.get_or_parse(_parse_dict_lines, connection.run_command('show version'))
+
+
+def test_cached_results_are_immutable():
+    from ndms2_client.client import _parse_dict_lines
+
+    cache = ParseCache()
+    tree = cache.get_or_parse(_parse_dict_lines, version_lines())
+
+    assert isinstance(tree, dict)
+    with pytest.raises(TypeError):
+        tree['release'] = 'patched'
+    with pytest.raises(TypeError):
+        tree['ndm'].update(exact='patched')
+
+
+def test_cache_size_is_bounded():
+    from ndms2_client.client import _parse_dict_lines
+
+    cache = ParseCache(maxsize=2)
+    for i in range(5):
+        cache.get_or_parse(_parse_dict_lines, ['    release: {}'.format(i)])
+
+    assert len(cache) == 2
+
+
+def test_cached_results_can_be_copied():
+    import copy
+    import pickle
+    from ndms2_client.client import _parse_dict_lines
+
+    cache = ParseCache()
+    tree = cache.get_or_parse(_parse_dict_lines, version_lines())
+    records = cache.get_or_parse(lambda lines: [lines], ['a', 'b'])
+
+    shallow = copy.copy(tree)
+    shallow['release'] = 'patched'
+
+    deep = copy.deepcopy(tree)
+    deep['ndm']['exact'] = 'patched'
+
+    restored = pickle.loads(pickle.dumps(tree))
+    restored['ndm']['exact'] = 'patched'
+
+    copied_records = copy.deepcopy(records)
+    copied_records[0].append('c')
+
+    assert type(deep) is dict and type(deep['ndm']) is dict
+    assert type(restored) is dict and type(restored['ndm']) is dict
+    assert type(pickle.loads(pickle.dumps(records))) is list
+    assert copied_records == [['a', 'b', 'c']]
+    assert tree['release'] == '2.15.A.4.0-0'
+    assert tree['ndm']['exact'] == '0-1a2b3c4'
+    assert records == [['a', 'b']]
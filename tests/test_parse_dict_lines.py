@@ -462,3 +462,15 @@ def hostpot_sample(request) -> Tuple[str, int]:
     ]
 
     return samples[request.param]
+
+
+def test_hotspot_items(hostpot_sample: Tuple[str, int]):
+    from ndms2_client.client import _parse_dict_lines, _iter_dict_items
+
+    sample, expected_hosts = hostpot_sample
+
+    hosts = _parse_dict_lines(sample.split('\n'))['host']
+    if not isinstance(hosts, list):
+        hosts = [hosts]
+
+    assert list(_iter_dict_items(sample.split('\n'), 'host')) == hosts
@@ -0,0 +1,127 @@
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ndms2_client import Device
+
+
+class PolledClient(object):
+    def __init__(self, devices: List[Device]):
+        self.devices = devices
+        self.polls = 0
+
+    def get_hotspot_devices(self) -> List[Device]:
+        self.polls += 1
+        return self.devices
+
+    def get_arp_devices(self) -> List[Device]:
+        return []
+
+    def get_associated_devices(self) -> List[Device]:
+        return []
+
+
+def test_parse_event():
+    from ndms2_client.presence import parse_event, EVENT_JOIN, EVENT_LEAVE
+
+    event = parse_event('<30>Oct 19 12:00:00 ndm: Network::Interface::Rtx::WifiMaster0/AccessPoint0: '
+                        'STA(60:ff:ff:ff:ff:ff) had associated successfully.')
+    assert event.kind == EVENT_JOIN
+    assert event.mac == '60:FF:FF:FF:FF:FF'
+    assert event.interface == 'WifiMaster0/AccessPoint0'
+
+    event = parse_event('ndm: WifiMaster1/AccessPoint0: STA(b8:ff:ff:ff:ff:ff) had deauthenticated by STA.')
+    assert event.kind == EVENT_LEAVE
+
+    event = parse_event('ndhcps: Dhcp::Server: sending ACK of 192.168.1.33 to 60:ff:ff:ff:ff:ff.')
+    assert event.kind == EVENT_JOIN
+    assert event.ip == '192.168.1.33'
+
+    assert parse_event('ndm: Core::Session: client disconnected.') is None
+
+
+def test_tracker_events_and_reconcile():
+    from ndms2_client.device_index import DeviceIndex
+    from ndms2_client.presence import PresenceTracker
+
+    now = [100.0]
+    index = DeviceIndex()
+    client = PolledClient([Device('60:FF:FF:FF:FF:FF', 'phone', '192.168.1.33', 'Home')])
+    tracker = PresenceTracker('office', index, client, reconcile_interval=60, clock=lambda: now[0])
+
+    assert tracker.maybe_reconcile()
+    assert not tracker.maybe_reconcile()
+    assert client.polls == 1
+
+    tracker.handle_line('WifiMaster0/AccessPoint0: STA(b8:ff:ff:ff:ff:ff) had associated successfully.')
+    assert tracker.access_point('b8:ff:ff:ff:ff:ff') == 'WifiMaster0/AccessPoint0'
+    # access points are not mixed with the bridges reported by polls
+    assert index.locate('b8:ff:ff:ff:ff:ff').interface is None
+
+    tracker.handle_line('WifiMaster0/AccessPoint0: STA(60:ff:ff:ff:ff:ff) had associated successfully.')
+    assert index.locate('60:ff:ff:ff:ff:ff').interface == 'Home'
+
+    tracker.handle_line('WifiMaster0/AccessPoint0: STA(60:ff:ff:ff:ff:ff) had disassociated.')
+    assert '60:ff:ff:ff:ff:ff' not in index
+
+    now[0] += 60
+    client.devices = []
+    assert tracker.maybe_reconcile()
+    assert len(index) == 0
+
+
+def test_tracker_roaming_and_dhcp():
+    from ndms2_client.device_index import DeviceIndex
+    from ndms2_client.presence import PresenceTracker
+
+    index = DeviceIndex()
+    tracker = PresenceTracker('office', index)
+
+    tracker.handle_line('WifiMaster1/AccessPoint0: STA(b8:ff:ff:ff:ff:ff) had associated successfully.')
+    tracker.handle_line('Dhcp::Server: sending ACK of 192.168.1.34 to b8:ff:ff:ff:ff:ff.')
+
+    assert tracker.access_point('b8:ff:ff:ff:ff:ff') == 'WifiMaster1/AccessPoint0'
+    assert index.locate('b8:ff:ff:ff:ff:ff').ip == '192.168.1.34'
+
+    tracker.handle_line('WifiMaster0/AccessPoint0: STA(b8:ff:ff:ff:ff:ff) had associated successfully.')
+    tracker.handle_line('WifiMaster1/AccessPoint0: STA(b8:ff:ff:ff:ff:ff) had deauthenticated by STA.')
+
+    assert tracker.access_point('b8:ff:ff:ff:ff:ff') == 'WifiMaster0/AccessPoint0'
+    assert index.locate('b8:ff:ff:ff:ff:ff').ip == '192.168.1.34'
+
+    tracker.handle_line('WifiMaster0/AccessPoint0: STA(b8:ff:ff:ff:ff:ff) had deauthenticated by STA.')
+    assert 'b8:ff:ff:ff:ff:ff' not in index
+    assert tracker.access_point('b8:ff:ff:ff:ff:ff') is None
+
+
+def test_tracker_reconciles_on_executor():
+    from ndms2_client.device_index import DeviceIndex
+    from ndms2_client.presence import PresenceTracker
+
+    submitted = []
+
+    class ManualExecutor(object):
+        def submit(self, func, *args):
+            submitted.append((func, args))
+
+    now = [100.0]
+    client = PolledClient([Device('60:FF:FF:FF:FF:FF', 'phone', '192.168.1.33', 'Home')])
+    tracker = PresenceTracker('office', DeviceIndex(), client, reconcile_interval=60, clock=lambda: now[0])
+    executor = ManualExecutor()
+
+    assert tracker.maybe_reconcile(executor)
+    now[0] += 60
+    # still waiting for a worker, so not submitted twice
+    assert not tracker.maybe_reconcile(executor)
+    assert client.polls == 0
+
+    func, args = submitted.pop()
+    func(*args)
+    assert client.polls == 1
+    assert not tracker.maybe_reconcile(executor)
+
+    now[0] += 60
+    assert tracker.maybe_reconcile(executor)
+    assert len(submitted) == 1
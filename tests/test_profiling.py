@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client
+
+_RESPONSES = {
+    'show ip arp': ['phone          192.168.1.33  60:ff:ff:ff:ff:ff Bridge0    ', 'garbage'],
+    'show interface': [
+        'Interface, name = "GigabitEthernet0": ',
+        '            id: GigabitEthernet0',
+        '         index: 0',
+        '          type: GigabitEthernet',
+        'Interface, name = "Bridge0": ',
+        '            id: Bridge0',
+        '         index: 0',
+        '          type: Bridge',
+        '           mtu: 1500',
+    ],
+}
+
+
+def test_profile_stages():
+    from ndms2_client import profiling
+
+    client = Client(StubConnection(_RESPONSES))
+
+    with profiling.profile() as profiler:
+        assert len(client.get_interfaces()) == 2
+        assert len(client.get_arp_devices()) == 1
+
+    stats = profiler.stats()
+
+    assert set(stats['show interface'].keys()) == {
+        profiling.STAGE_FIX_CONTINUATION, profiling.STAGE_PARSE_DICT, profiling.STAGE_FROM_DICT,
+    }
+    assert stats['show interface'][profiling.STAGE_FROM_DICT].calls == 2
+    assert stats['show ip arp'][profiling.STAGE_PARSE_TABLE].items == 2
+    assert 'show interface' in profiler.report()
+    assert profiling.active() is None
@@ -0,0 +1,94 @@
+import os
+import sys
+from typing import List
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client, ConnectionTimeoutException
+
+
+def scripted_response(command: str) -> List[str]:
+    if command == 'show ip arp':
+        return [
+            'phone          192.168.1.33  60:ff:ff:ff:ff:ff Bridge0    ',
+            '               192.168.1.34  b8:ff:ff:ff:ff:ff Bridge0    ',
+        ]
+    raise ConnectionTimeoutException('No expected response from server')
+
+
+def test_record_and_replay(tmpdir):
+    from ndms2_client.recording import RecordingConnection, ReplayConnection
+
+    path = str(tmpdir.join('capture.jsonl'))
+
+    recording = RecordingConnection(StubConnection(scripted_response), path)
+    expected = Client(recording).get_arp_devices()
+    with pytest.raises(ConnectionTimeoutException):
+        Client(recording).get_router_info()
+    recording.close()
+
+    client = Client(ReplayConnection(path, loop=True))
+
+    assert client.get_arp_devices() == expected
+    assert client.get_arp_devices() == expected
+    with pytest.raises(ConnectionTimeoutException):
+        client.get_router_info()
+
+
+def test_replay_exhausted(tmpdir):
+    from ndms2_client import ConnectionException
+    from ndms2_client.recording import RecordingConnection, ReplayConnection
+
+    path = str(tmpdir.join('capture.jsonl'))
+
+    recording = RecordingConnection(StubConnection(scripted_response), path)
+    Client(recording).get_arp_devices()
+    recording.close()
+
+    client = Client(ReplayConnection(path))
+    client.get_arp_devices()
+
+    with pytest.raises(ConnectionException):
+        client.get_arp_devices()
+    with pytest.raises(ConnectionException):
+        client.get_interfaces()
+
+
+def test_record_failed_batch(tmpdir):
+    from ndms2_client.recording import RecordingConnection, ReplayConnection
+
+    path = str(tmpdir.join('capture.jsonl'))
+
+    connection = StubConnection(scripted_response)
+    recording = RecordingConnection(connection, path)
+    recording.connect(timeout=5)
+    with pytest.raises(ConnectionTimeoutException):
+        recording.run_commands(['show version', 'show ip arp'])
+    recording.close()
+
+    assert connection.connect_timeout == 5
+
+    replay = ReplayConnection(path)
+    rerecording = RecordingConnection(replay, str(tmpdir.join('again.jsonl')))
+    rerecording.connect(timeout=5)
+    rerecording.close()
+    assert replay.connected
+    with pytest.raises(ConnectionTimeoutException):
+        replay.run_commands(['show version', 'show ip arp'])
+
+
+def test_replay_latency_exceeding_timeout(tmpdir):
+    import json
+    from ndms2_client.recording import ReplayConnection
+
+    path = tmpdir.join('capture.jsonl')
+    path.write(json.dumps({'command': 'show version', 'response': ['      model: Keenetic Giga'], 'elapsed': 0.05}))
+
+    replay = ReplayConnection(str(path), with_latency=True, loop=True)
+
+    with pytest.raises(ConnectionTimeoutException):
+        replay.run_command('show version', timeout=0.01)
+    assert replay.run_command('show version', timeout=1) == ['      model: Keenetic Giga']
@@ -0,0 +1,55 @@
+import os
+import sys
+from typing import List
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client, RetryPolicy, ConnectionTimeoutException, AuthenticationException, \
+    RouterBusyException
+
+
+def flaky_connection(failures: List[Exception]) -> StubConnection:
+    def respond(command: str) -> List[str]:
+        if len(failures) > 0:
+            raise failures.pop(0)
+        if command == 'show version':
+            return ['    release: 2.15.A.4.0-0', '      model: Keenetic Giga']
+        return ['Core::System::StartupConfig: Saving (cli).']
+
+    return StubConnection(respond)
+
+
+def test_read_is_retried():
+    delays = []
+    connection = flaky_connection([ConnectionTimeoutException('timeout'), RouterBusyException(1, 'busy')])
+    client = Client(connection, retry_policy=RetryPolicy(3, sleep=delays.append))
+
+    info = client.get_router_info()
+
+    assert info.model == 'Keenetic Giga'
+    assert connection.commands == ['show version'] * 3
+    assert len(delays) == 2
+    assert 0 < delays[0] <= delays[1] * 2
+
+
+def test_auth_error_is_not_retried():
+    connection = flaky_connection([AuthenticationException('Login incorrect')])
+    client = Client(connection, retry_policy=RetryPolicy(3, sleep=lambda _: None))
+
+    with pytest.raises(AuthenticationException):
+        client.get_router_info()
+
+    assert len(connection.commands) == 1
+
+
+def test_write_is_not_retried():
+    connection = flaky_connection([ConnectionTimeoutException('timeout')])
+    client = Client(connection, retry_policy=RetryPolicy(3, sleep=lambda _: None))
+
+    with pytest.raises(ConnectionTimeoutException):
+        client.save_configuration()
+
+    assert len(connection.commands) == 1
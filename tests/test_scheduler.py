@@ -0,0 +1,106 @@
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class ManualExecutor(object):
+    def __init__(self):
+        self.pending = []
+        self.shut_down = False
+
+    def submit(self, func, *args):
+        self.pending.append((func, args))
+
+    def run_all(self):
+        pending, self.pending = self.pending, []
+        for func, args in pending:
+            func(*args)
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def test_scheduler_intervals_and_coalescing():
+    from ndms2_client.scheduler import PollingScheduler, Query, QueryResult
+
+    now = [0.0]
+    results = []  # type: List[QueryResult]
+    executor = ManualExecutor()
+    scheduler = PollingScheduler(results.append, jitter=0, coalesce_window=1,
+                                 executor=executor, clock=lambda: now[0])
+
+    scheduler.add_router('office', 'client', [
+        Query('devices', 10, lambda client: 'devices'),
+        Query('interfaces', 30, lambda client: 'interfaces'),
+    ])
+
+    visits = 0
+    for second in range(0, 61):
+        now[0] = float(second)
+        visits += scheduler.run_pending()
+        executor.run_all()
+
+    queries = [result.query for result in results]
+    assert queries.count('devices') == 7
+    assert queries.count('interfaces') == 3
+    # interfaces always run together with devices
+    assert visits == 7
+    assert all(result.error is None for result in results)
+
+
+def test_scheduler_skips_busy_router():
+    from ndms2_client.scheduler import PollingScheduler, Query
+
+    now = [0.0]
+    results = []
+    executor = ManualExecutor()
+    scheduler = PollingScheduler(results.append, jitter=0, executor=executor, clock=lambda: now[0])
+
+    scheduler.add_router('office', 'client', [Query('devices', 10, lambda client: 1 / 0)])
+
+    assert scheduler.run_pending() == 1
+    now[0] = 10
+    assert scheduler.run_pending() == 0
+    assert scheduler.skipped('office') == 1
+
+    executor.run_all()
+    now[0] = 20
+    assert scheduler.run_pending() == 1
+    executor.run_all()
+
+    assert len(results) == 2
+    assert isinstance(results[0].error, ZeroDivisionError)
+
+
+def test_scheduler_defers_queries_due_during_visit():
+    from ndms2_client.scheduler import PollingScheduler, Query
+
+    now = [0.0]
+    results = []
+    executor = ManualExecutor()
+    scheduler = PollingScheduler(results.append, jitter=0, coalesce_window=0, executor=executor,
+                                 clock=lambda: now[0])
+
+    scheduler.add_router('office', 'client', [
+        Query('devices', 10, lambda client: 'devices'),
+        Query('version', 25, lambda client: 'version'),
+    ])
+
+    # every visit takes 7 seconds, so the version query falls due while one is running
+    finishes = None
+    for second in range(0, 201):
+        now[0] = float(second)
+        if finishes == second:
+            executor.run_all()
+            finishes = None
+        if scheduler.run_pending() > 0:
+            finishes = second + 7
+
+    queries = [result.query for result in results]
+    assert queries.count('version') == 8
+    assert scheduler.skipped('office') > 0
+
+    scheduler.stop()
+    assert not executor.shut_down
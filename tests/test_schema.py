@@ -0,0 +1,93 @@
+import os
+import sys
+from typing import NamedTuple, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client, CommandSchema, Field
+
+
+class Station(NamedTuple):
+    mac: str
+    ap: str
+    authenticated: Optional[str]
+    rssi: Optional[int]
+    tx_rate: Optional[int]
+
+
+class Host(NamedTuple):
+    mac: str
+    interface: Optional[str]
+    active: bool
+
+
+_ASSOCIATIONS = '''
+          station: 
+                  mac: 60:ff:ff:ff:ff:ff
+                   ap: WifiMaster0/AccessPoint0
+        authenticated: yes
+               txrate: 65
+                 rssi: -46
+
+          station: 
+                  mac: b8:ff:ff:ff:ff:ff
+                   ap: WifiMaster1/AccessPoint0
+        authenticated: yes
+               txrate: 130
+'''
+
+_HOTSPOT = '''
+             host: 
+                  mac: 60:ff:ff:ff:ff:ff
+               active: yes
+            interface: 
+                             id: Bridge0
+                           name: Home
+'''
+
+
+def static_connection() -> StubConnection:
+    return StubConnection(lambda command: (_HOTSPOT if 'hotspot' in command else _ASSOCIATIONS).split('\n'))
+
+
+def test_query_items():
+    schema = CommandSchema('show associations', Station, {'tx_rate': 'txrate'}, items='station')
+    client = Client(static_connection())
+
+    stations = client.query(schema)
+
+    assert stations == [
+        Station('60:ff:ff:ff:ff:ff', 'WifiMaster0/AccessPoint0', 'yes', -46, 65),
+        Station('b8:ff:ff:ff:ff:ff', 'WifiMaster1/AccessPoint0', 'yes', None, 130),
+    ]
+
+
+def test_query_nested_fields_and_arguments():
+    schema = CommandSchema('show ip hotspot {}', Host, {
+        'interface': 'interface/name',
+        'active': Field('active', lambda value: value == 'yes', False),
+    }, items='host')
+    connection = static_connection()
+
+    hosts = Client(connection).query(schema, '60:ff:ff:ff:ff:ff')
+
+    assert connection.commands == ['show ip hotspot 60:ff:ff:ff:ff:ff']
+    assert hosts == [Host('60:ff:ff:ff:ff:ff', 'Home', True)]
+
+
+def test_query_bool_fields():
+    class Association(NamedTuple):
+        mac: str
+        authenticated: Optional[bool]
+        active: bool
+
+    schema = CommandSchema('show associations', Association, {'active': 'authenticated'}, items='station')
+
+    stations = Client(static_connection()).query(schema)
+
+    assert stations[0] == Association('60:ff:ff:ff:ff:ff', True, True)
+    assert type(stations[0].authenticated) is bool
+
+    from ndms2_client.schema import _to_bool
+    assert [_to_bool(value) for value in ('yes', 'no', '1', '0', 1)] == [True, False, True, False, True]
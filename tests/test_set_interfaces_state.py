@@ -0,0 +1,48 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client, CommandException
+
+_INTERFACE_UP = ['Network::Interface::Base: interface is up.']
+
+
+def test_set_interfaces_state_saves_once():
+    connection = StubConnection(default=_INTERFACE_UP)
+    client = Client(connection)
+
+    client.set_interfaces_state({'GuestWiFi': True, 'WifiMaster0/AccessPoint1': False}, failsafe_commit=True)
+
+    assert connection.commands == [
+        'interface GuestWiFi up',
+        'interface WifiMaster0/AccessPoint1 down',
+        'system configuration fail-safe commit',
+        'system configuration save',
+    ]
+
+
+def test_set_interfaces_state_error_skips_save():
+    connection = StubConnection({
+        'interface GuestWiF up': [
+            'Network::Interface::Base error[6553609]: unable to find GuestWiF as "Network::Interface::Base".'
+        ],
+    }, default=_INTERFACE_UP)
+    client = Client(connection)
+
+    with pytest.raises(CommandException) as info:
+        client.set_interfaces_state({'GuestWiF': True, 'GuestWiFi': False})
+
+    assert info.value.applied == ['interface GuestWiFi down']
+    assert connection.commands == ['interface GuestWiF up', 'interface GuestWiFi down']
+
+
+def test_set_no_interfaces_state():
+    connection = StubConnection(default=_INTERFACE_UP)
+
+    Client(connection).set_interfaces_state({})
+
+    assert connection.commands == []
+    assert CommandException(1, 'failed').applied == []
@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ndms2_client import Device, RouterInfo
+
+
+def test_snapshot_roundtrip(tmpdir):
+    from ndms2_client.snapshot import SnapshotReader, SnapshotWriter
+
+    path = str(tmpdir.join('snapshots.bin'))
+    devices = [
+        Device(mac='60:FF:FF:FF:FF:FF', name='phone', ip='192.168.1.33', interface='Bridge0'),
+        Device(mac='B8:FF:FF:FF:FF:FF', name=None, ip='192.168.1.34', interface='Bridge0'),
+    ]
+    info = [RouterInfo('Giga', '2.15', 'stable', 'Keenetic Giga', 'N/A', 'Keenetic Ltd.', 'Keenetic', 'RU')]
+    tree = {'host': [{'mac': '60:ff:ff:ff:ff:ff', 'uptime': -1, 'ratio': 0.5, 'active': True}], 'empty': {}}
+
+    with SnapshotWriter(path) as writer:
+        writer.append(devices, timestamp=1.0)
+        writer.append(info, timestamp=2.0)
+
+    with SnapshotWriter(path) as writer:
+        writer.append(tree, timestamp=3.0)
+        writer.append([], timestamp=4.0)
+
+    with SnapshotReader(path) as reader:
+        snapshots = list(reader)
+
+    assert [s.timestamp for s in snapshots] == [1.0, 2.0, 3.0, 4.0]
+    assert snapshots[0].data == devices
+    assert isinstance(snapshots[0].data[0], Device)
+    assert snapshots[1].data == info
+    assert snapshots[2].data == tree
+    assert snapshots[3].data == []
+
+
+def test_snapshot_truncated_frame(tmpdir):
+    from ndms2_client.snapshot import SnapshotReader, SnapshotWriter
+
+    path = str(tmpdir.join('snapshots.bin'))
+    with SnapshotWriter(path) as writer:
+        writer.append({'a': '1'}, timestamp=1.0)
+        writer.append({'b': '2'}, timestamp=2.0)
+
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+
+    with SnapshotReader(path) as reader:
+        assert [s.data for s in reader] == [{'a': '1'}]
@@ -0,0 +1,195 @@
+import os
+import re
+import sys
+from typing import List
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeTelnet(object):
+    """Emulates the router CLI with the `interface` and `ip` configuration groups."""
+
+    def __init__(self):
+        self.buffer = b''
+        self.rawq = b''
+        self.irawq = 0
+        self.flushes = 0
+        self.delay = 0.0
+        self.now = 0.0
+        self.prompts = [b'(config)> ']
+
+    @property
+    def cookedq(self) -> bytes:
+        return self.buffer
+
+    def sock_avail(self) -> bool:
+        raise AssertionError('the socket should not be polled after every command')
+
+    def set_option_negotiation_callback(self, callback):
+        pass
+
+    def open(self, host, port, timeout):
+        self.buffer = b'Login: '
+
+    def get_socket(self):
+        return self
+
+    def sendall(self, data):
+        pass
+
+    def read_very_eager(self):
+        self.flushes += 1
+        text, self.buffer = self.buffer, b''
+        return text
+
+    def write(self, data: bytes):
+        for command in data.decode('UTF-8').split('\n')[:-1]:
+            if command == 'admin':
+                self.buffer += b'admin\nPassword: '
+                continue
+            if command == 'secret':
+                self.buffer += b'\nWelcome to NDMS\n' + self.prompts[-1]
+                continue
+
+            output = b''
+            if command.startswith('interface GuestWiF '):
+                output = (b'Network::Interface::Base error[6553609]: '
+                          b'unable to find GuestWiF as "Network::Interface::Base".\n')
+            elif command.startswith('interface ') and command.endswith((' up', ' down')):
+                output = b'Network::Interface::Base: interface is up.\n'
+            elif command.startswith('interface '):
+                self.prompts.append(b'(config-if)> ')
+            elif command.startswith('ip dhcp pool '):
+                self.prompts.append(b'(config-dhcp-pool)> ')
+            elif command.startswith('ip policy '):
+                self.prompts.append(b'(config-policy)> ')
+            elif command.startswith('interfac'):
+                output = b'Command::Base error[7405600]: no such command: interfac.\n'
+            elif command == 'exit':
+                if len(self.prompts) > 1:
+                    self.prompts.pop()
+            else:
+                output = b'Network::Interface::Base: ok.\n'
+            self.buffer += command.encode('UTF-8') + b'\n' + output + b'\n' + self.prompts[-1]
+
+    def clock(self) -> float:
+        return self.now
+
+    def expect(self, matchers: list, timeout):
+        if self.delay > timeout:
+            self.now += timeout
+            return -1, None, b''
+        self.now += self.delay
+        for i, matcher in enumerate(matchers):
+            match = re.compile(matcher).search(self.buffer)
+            if match:
+                text, self.buffer = self.buffer[:match.end()], self.buffer[match.end():]
+                return i, match, text
+        return -1, None, self.buffer
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    telnetlib = pytest.importorskip('telnetlib')
+    from ndms2_client import TelnetConnection
+
+    telnet = FakeTelnet()
+    monkeypatch.setattr(telnetlib, 'Telnet', lambda: telnet)
+
+    connection = TelnetConnection('192.168.1.1', 23, 'admin', 'secret')
+    connection.telnet = telnet
+    return connection
+
+
+def test_flush_only_when_needed(connection):
+    assert connection.run_command('show version') == ['Network::Interface::Base: ok.', '']
+    assert connection.run_command('show version') == ['Network::Interface::Base: ok.', '']
+
+    assert connection.telnet.flushes == 1
+
+
+def test_config_groups(connection):
+    lines = []  # type: List[str]
+    with connection.group('interface Bridge0'):
+        lines += connection.run_command('description Home')
+    with connection.group('interface Bridge1'):
+        lines += connection.run_command('description Guest')
+
+    assert lines == ['Network::Interface::Base: ok.', ''] * 2
+    assert connection.telnet.prompts == [b'(config)> ']
+    assert connection.run_command('show version') == ['Network::Interface::Base: ok.', '']
+
+
+def test_failed_group(connection):
+    from ndms2_client import CommandException
+
+    with connection.group('interface Bridge0'):
+        pass
+
+    with pytest.raises(CommandException):
+        connection.enter_group('interfac Bridge0')
+
+    assert connection.connected
+    assert connection.run_command('show version') == ['Network::Interface::Base: ok.', '']
+
+
+def test_groups_sharing_keyword(connection):
+    with connection.group('ip dhcp pool _WEBADMIN'):
+        connection.run_command('range 192.168.1.33 120')
+    with connection.group('ip policy Policy0'):
+        connection.run_command('description Guest')
+    with connection.group('ip dhcp pool _WEBADMIN_GUEST_AP'):
+        connection.run_command('range 10.1.30.33 120')
+
+    assert connection.telnet.prompts == [b'(config)> ']
+    assert connection.run_command('show version') == ['Network::Interface::Base: ok.', '']
+    assert connection.telnet.flushes == 1
+
+
+def test_pipelined_interface_states(connection):
+    from ndms2_client import Client, CommandException
+
+    client = Client(connection)
+    with pytest.raises(CommandException) as info:
+        client.set_interfaces_state({'GuestWiFi': True, 'GuestWiF': True, 'Bridge1': False})
+
+    assert info.value.applied == ['interface GuestWiFi up', 'interface Bridge1 down']
+    assert 'interface GuestWiF up' in info.value.message
+    assert connection.telnet.buffer == b''
+
+    client.set_interfaces_state({'GuestWiFi': False, 'Bridge1': True}, save=False)
+    assert connection.run_command('show version') == ['Network::Interface::Base: ok.', '']
+
+
+def test_adaptive_timeout_recovers(monkeypatch):
+    import types
+    telnetlib = pytest.importorskip('telnetlib')
+    from ndms2_client import TelnetConnection, LatencyTracker, ConnectionTimeoutException
+    from ndms2_client import connection as connection_module
+
+    telnet = FakeTelnet()
+    monkeypatch.setattr(telnetlib, 'Telnet', lambda: telnet)
+    monkeypatch.setattr(connection_module, 'time', types.SimpleNamespace(monotonic=telnet.clock))
+
+    tracker = LatencyTracker(min_samples=5)
+    connection = TelnetConnection('192.168.1.1', 23, 'admin', 'secret', latency_tracker=tracker)
+
+    telnet.delay = 0.05
+    for _ in range(5):
+        connection.run_command('show version')
+    assert tracker.timeout('show version', 30) == 1
+
+    telnet.delay = 1.5
+    succeeded = []
+    for _ in range(5):
+        try:
+            connection.run_command('show version')
+        except ConnectionTimeoutException:
+            succeeded.append(False)
+        else:
+            succeeded.append(True)
+
+    assert succeeded == [False, True, True, True, True]
+    assert tracker.timeout('show version', 30) > 1.5
@@ -0,0 +1,46 @@
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def test_capture(tmpdir):
+    from ndms2_client import tracing
+
+    path = str(tmpdir.join('capture.jsonl'))
+    logger = logging.getLogger('ndms2_client.test_tracing')
+    logger.setLevel(logging.INFO)
+
+    tracing.enable_capture(path)
+    tracing.configure(max_size=10)
+    try:
+        tracing.trace_response(logger, 'show version', ['release: 2.15.A.4.0-0', 'model: Keenetic Giga'])
+        tracing.trace_response(logger, 'show ip arp', ['short'])
+    finally:
+        tracing.disable_capture()
+        tracing.configure(max_size=4096)
+
+    with open(path, 'r', encoding='UTF-8') as f:
+        records = [json.loads(line) for line in f]
+
+    assert [record['command'] for record in records] == ['show version', 'show ip arp']
+    assert records[0]['response'] == 'release: 2'
+    assert records[0]['truncated'] is True
+    assert records[0]['lines'] == 2
+    assert records[1]['response'] == 'short'
+    assert records[1]['truncated'] is False
+
+
+def test_no_formatting_when_disabled():
+    from ndms2_client import tracing
+
+    class Lines(list):
+        def __iter__(self):
+            raise AssertionError('Response should not be formatted')
+
+    logger = logging.getLogger('ndms2_client.test_tracing')
+    logger.setLevel(logging.INFO)
+
+    tracing.trace_response(logger, 'show version', Lines(['release: 2.15.A.4.0-0']))
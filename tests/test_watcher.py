@@ -0,0 +1,95 @@
+import os
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import StubConnection
+from ndms2_client import Client
+
+
+def interfaces_connection(interfaces: Dict[str, Dict[str, str]]) -> StubConnection:
+    def respond(command: str) -> List[str]:
+        lines = []
+        for name, fields in interfaces.items():
+            if command not in ('show interface', 'show interface ' + name,
+                               'show interface {}'.format(fields.get('interface-name'))):
+                continue
+            if command == 'show interface':
+                lines.append('Interface, name = "{}": '.format(name))
+            lines.append('{:>16}: {}'.format('id', name))
+            lines += ['{:>16}: {}'.format(key, value) for key, value in fields.items()]
+        return lines
+
+    return StubConnection(respond)
+
+
+def test_watcher_events():
+    from ndms2_client.watcher import InterfaceWatcher, EVENT_CHANGED, EVENT_FLAPPED, EVENT_ADDED, EVENT_REMOVED
+
+    now = [0.0]
+    interfaces = {
+        'GigabitEthernet1': {'link': 'up', 'connected': 'yes', 'state': 'up', 'uptime': '100'},
+        'WifiMaster0/AccessPoint1': {'link': 'down', 'connected': 'no', 'state': 'down'},
+    }
+    connection = interfaces_connection(interfaces)
+    watcher = InterfaceWatcher(Client(connection), clock=lambda: now[0])
+
+    assert watcher.poll() == []
+
+    now[0] = 60
+    interfaces['GigabitEthernet1']['uptime'] = '20'
+    interfaces['WifiMaster0/AccessPoint1']['state'] = 'up'
+    interfaces['Bridge0'] = {'link': 'up', 'connected': 'yes', 'state': 'up', 'uptime': '5'}
+    events = {event.name: event.kind for event in watcher.poll()}
+
+    assert events == {
+        'GigabitEthernet1': EVENT_FLAPPED,
+        'WifiMaster0/AccessPoint1': EVENT_CHANGED,
+        'Bridge0': EVENT_ADDED,
+    }
+
+    now[0] = 120
+    interfaces['GigabitEthernet1']['uptime'] = '80'
+    del interfaces['Bridge0']
+    assert [(event.name, event.kind) for event in watcher.poll()] == [('Bridge0', EVENT_REMOVED)]
+    assert connection.commands == ['show interface'] * 3
+
+
+def test_watcher_single_interface():
+    from ndms2_client.watcher import InterfaceWatcher
+
+    connection = interfaces_connection({
+        'GigabitEthernet1': {'link': 'up', 'connected': 'yes', 'state': 'up', 'uptime': '100'},
+        'Bridge0': {'link': 'up', 'connected': 'yes', 'state': 'up', 'uptime': '5'},
+    })
+    watcher = InterfaceWatcher(Client(connection), ['Bridge0'])
+
+    watcher.poll()
+
+    assert connection.commands == ['show interface Bridge0']
+    assert list(watcher.states.keys()) == ['Bridge0']
+    assert watcher.states['Bridge0'].uptime == 5
+
+
+def test_watcher_interface_names():
+    from ndms2_client.watcher import InterfaceWatcher
+
+    interfaces = {
+        'WifiMaster0/AccessPoint1': {'interface-name': 'GuestWiFi', 'link': 'up', 'state': 'up'},
+        'GigabitEthernet1': {'link': 'up', 'state': 'up'},
+    }
+
+    single = InterfaceWatcher(Client(interfaces_connection(interfaces)), ['GuestWiFi'])
+    single.poll()
+    assert list(single.states.keys()) == ['GuestWiFi']
+    assert single.states['GuestWiFi'].id == 'WifiMaster0/AccessPoint1'
+
+    listed = InterfaceWatcher(Client(interfaces_connection(interfaces)), ['GuestWiFi', 'GigabitEthernet1'],
+                              single_query_limit=0)
+    listed.poll()
+    assert sorted(listed.states.keys()) == ['GigabitEthernet1', 'GuestWiFi']
+
+    by_id = InterfaceWatcher(Client(interfaces_connection(interfaces)), ['WifiMaster0/AccessPoint1'])
+    by_id.poll()
+    assert list(by_id.states.keys()) == ['GuestWiFi']